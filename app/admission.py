@@ -0,0 +1,200 @@
+import asyncio
+import json
+import logging
+import math
+import os
+import time
+from collections import deque
+from typing import Optional
+
+from app.coalesce import coalescer, request_key
+from app.database import DB_POOL_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Настройки допуска запросов
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() in ("1", "true", "yes")
+ADMISSION_READ_LIMIT = int(os.getenv("ADMISSION_READ_LIMIT", "16"))
+ADMISSION_READ_QUEUE = int(os.getenv("ADMISSION_READ_QUEUE", "256"))
+ADMISSION_WRITE_LIMIT = int(os.getenv("ADMISSION_WRITE_LIMIT", "4"))
+ADMISSION_WRITE_QUEUE = int(os.getenv("ADMISSION_WRITE_QUEUE", "64"))
+ADMISSION_MAX_WAIT = float(os.getenv("ADMISSION_MAX_WAIT", "2"))
+
+# Допущенный запрос не должен ждать соединение в пуле БД
+if ADMISSION_READ_LIMIT + ADMISSION_WRITE_LIMIT > DB_POOL_SIZE:
+    logger.warning(
+        "Admission limits (%d reads + %d writes) exceed DB_POOL_SIZE=%d",
+        ADMISSION_READ_LIMIT, ADMISSION_WRITE_LIMIT, DB_POOL_SIZE
+    )
+
+# Дешёвые запросы, потоки SSE и служебные маршруты не занимают слоты
+EXEMPT_PATHS = {"/", "/health", "/metrics"}
+EXEMPT_PREFIXES = ("/admin/", "/debug/")
+EXEMPT_SUFFIXES = ("/stream",)
+
+TIMEOUT_HEADER = b"x-request-timeout"
+READ_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+class AdmissionLimiter:
+    """Ограничение одновременных запросов с ограниченной очередью ожидания"""
+
+    def __init__(self, name: str, limit: int, queue_size: int):
+        self.name = name
+        self.limit = limit
+        self.queue_size = queue_size
+        self.active = 0
+        self._waiters: deque = deque()
+        # Скользящее среднее времени обработки для оценки ожидания
+        self.service_time = 0.01
+        self.admitted = 0
+        self.shed = 0
+        self.timeouts = 0
+
+    def estimated_wait(self) -> float:
+        """Оценка ожидания нового запроса в очереди, с"""
+        return (len(self._waiters) + 1) * self.service_time / self.limit
+
+    async def acquire(self, timeout: float) -> bool:
+        """Занять слот; False — запрос нужно отклонить"""
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            self.admitted += 1
+            return True
+
+        # Очередь полна или запрос заведомо не дождётся слота до своего дедлайна
+        if len(self._waiters) >= self.queue_size or self.estimated_wait() > timeout:
+            self.shed += 1
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # Слот успели передать: возвращаем его следующему
+                self.release(0)
+            else:
+                self._remove(waiter)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            self.timeouts += 1
+            self.shed += 1
+            return False
+
+        self.admitted += 1
+        return True
+
+    def release(self, elapsed: float) -> None:
+        """Освободить слот и передать его первому ожидающему"""
+        if elapsed:
+            self.service_time = 0.9 * self.service_time + 0.1 * elapsed
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    def _remove(self, waiter: asyncio.Future) -> None:
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    def stats(self) -> dict:
+        return {
+            "limit": self.limit,
+            "active": self.active,
+            "queue_depth": len(self._waiters),
+            "admitted": self.admitted,
+            "shed": self.shed,
+            "timeouts": self.timeouts,
+        }
+
+
+class AdmissionController:
+    """Лимиты для классов маршрутов: чтение и запись"""
+
+    def __init__(self, enabled: bool = ADMISSION_ENABLED, max_wait: float = ADMISSION_MAX_WAIT):
+        self.enabled = enabled
+        self.max_wait = max_wait
+        self.read = AdmissionLimiter("read", ADMISSION_READ_LIMIT, ADMISSION_READ_QUEUE)
+        self.write = AdmissionLimiter("write", ADMISSION_WRITE_LIMIT, ADMISSION_WRITE_QUEUE)
+        # Чтения, присоединившиеся к уже выполняющемуся объединённому запросу
+        self.coalesced = 0
+
+    def limiter_for(self, method: str, path: str) -> Optional[AdmissionLimiter]:
+        if path in EXEMPT_PATHS or path.startswith(EXEMPT_PREFIXES) or path.endswith(EXEMPT_SUFFIXES):
+            return None
+        return self.read if method in READ_METHODS else self.write
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "coalesced": self.coalesced,
+            "read": self.read.stats(),
+            "write": self.write.stats(),
+        }
+
+
+controller = AdmissionController()
+
+
+def _request_timeout(headers: list, default: float) -> float:
+    """Дедлайн клиента из X-Request-Timeout (секунды), не больше default"""
+    for name, value in headers:
+        if name == TIMEOUT_HEADER:
+            try:
+                return max(min(float(value), default), 0.0)
+            except ValueError:
+                break
+    return default
+
+
+class AdmissionMiddleware:
+    """Сброс нагрузки: 503 с Retry-After, если слот не освободится вовремя"""
+
+    def __init__(self, app, admission: AdmissionController = controller):
+        self.app = app
+        self.admission = admission
+
+    async def __call__(self, scope, receive, send):
+        if not self.admission.enabled or scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        limiter = self.admission.limiter_for(scope["method"], scope["path"])
+        if limiter is None:
+            return await self.app(scope, receive, send)
+
+        # Такое же чтение уже выполняется: ответ будет получен без обращения к БД,
+        # слот не нужен
+        if limiter is self.admission.read and coalescer.joinable(request_key(scope)):
+            self.admission.coalesced += 1
+            return await self.app(scope, receive, send)
+
+        timeout = _request_timeout(scope["headers"], self.admission.max_wait)
+        if not await limiter.acquire(timeout):
+            return await self._reject(send, limiter)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release(time.perf_counter() - start)
+
+    @staticmethod
+    async def _reject(send, limiter: AdmissionLimiter) -> None:
+        body = json.dumps({"detail": "Server is overloaded, retry later"}).encode()
+        retry_after = max(1, math.ceil(limiter.estimated_wait()))
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(retry_after).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,132 @@
+import asyncio
+import argparse
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import queries
+from app.database import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Настройки архивации (0 дней — архивация выключена)
+ARCHIVE_AFTER_DAYS = float(os.getenv("ARCHIVE_AFTER_DAYS", "0"))
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "500"))
+ARCHIVE_INTERVAL = float(os.getenv("ARCHIVE_INTERVAL", "3600"))
+ARCHIVE_PAUSE = float(os.getenv("ARCHIVE_PAUSE", "0.05"))
+# Как часто чтения перепроверяют пустой архив (его мог заполнить другой процесс)
+ARCHIVE_RECHECK_INTERVAL = float(os.getenv("ARCHIVE_RECHECK_INTERVAL", "60"))
+
+
+class ArchiveState:
+    """Есть ли строки в архиве: пока их нет, чтения к архиву не обращаются"""
+
+    def __init__(self, recheck_interval: float = ARCHIVE_RECHECK_INTERVAL):
+        self.recheck_interval = recheck_interval
+        self.has_rows = False
+        self._checked_at: Optional[float] = None
+
+    async def active(self, db: AsyncSession) -> bool:
+        """Нужно ли читать архив; пустой архив перепроверяется не чаще recheck_interval"""
+        if self.has_rows:
+            return True
+        now = time.monotonic()
+        if self._checked_at is None or now - self._checked_at >= self.recheck_interval:
+            await self.refresh(db)
+        return self.has_rows
+
+    async def refresh(self, db: AsyncSession) -> None:
+        """Проверить архив запросом к БД"""
+        self._checked_at = time.monotonic()
+        result = await db.execute(queries.ARCHIVE_HAS_ROWS)
+        self.has_rows = result.first() is not None
+
+    def mark(self) -> None:
+        """Архиватор перенёс строки"""
+        self.has_rows = True
+
+
+# Состояние архива в процессе
+archive_state = ArchiveState()
+
+
+async def archive_batch(db: AsyncSession, cutoff: datetime, batch_size: int) -> int:
+    """Перенести в архив одну порцию комментариев старше cutoff"""
+    result = await db.execute(
+        queries.ARCHIVE_CANDIDATES,
+        {"cutoff": cutoff, "limit": batch_size}
+    )
+    ids = result.scalars().all()
+    if not ids:
+        return 0
+
+    # Копирование и удаление в одной транзакции
+    await db.execute(queries.COPY_TO_ARCHIVE, {"ids": ids, "archived_at": datetime.utcnow()})
+    await db.execute(queries.DELETE_HOT_COMMENTS, {"ids": ids})
+    await db.commit()
+    archive_state.mark()
+    return len(ids)
+
+
+async def archive_comments(
+        older_than: timedelta,
+        batch_size: int = ARCHIVE_BATCH_SIZE,
+        pause: float = ARCHIVE_PAUSE
+) -> int:
+    """Перенести в архив все комментарии старше older_than небольшими порциями"""
+    cutoff = datetime.utcnow() - older_than
+    total = 0
+    while True:
+        # Короткая транзакция на порцию, чтобы не держать блокировку записи
+        async with AsyncSessionLocal() as db:
+            moved = await archive_batch(db, cutoff, batch_size)
+        total += moved
+        if moved < batch_size:
+            break
+        await asyncio.sleep(pause)
+
+    if total:
+        logger.info("Archived %d comments older than %s", total, cutoff)
+    return total
+
+
+async def archive_loop(
+        older_than: timedelta,
+        interval: float = ARCHIVE_INTERVAL
+) -> None:
+    """Фоновая архивация с заданным интервалом"""
+    while True:
+        try:
+            await archive_comments(older_than)
+            # Строки мог перенести архиватор другого воркера
+            async with AsyncSessionLocal() as db:
+                await archive_state.refresh(db)
+        except Exception:
+            logger.exception("Comment archival failed")
+        await asyncio.sleep(interval)
+
+
+def start_archiver() -> Optional[asyncio.Task]:
+    """Запустить фоновую архивацию, если она включена в настройках"""
+    if ARCHIVE_AFTER_DAYS <= 0:
+        return None
+    return asyncio.create_task(archive_loop(timedelta(days=ARCHIVE_AFTER_DAYS)))
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Архивация старых комментариев")
+    parser.add_argument("--days", type=float, default=ARCHIVE_AFTER_DAYS or 90,
+                        help="Переносить комментарии старше указанного числа дней")
+    parser.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE)
+    args = parser.parse_args()
+
+    moved = await archive_comments(timedelta(days=args.days), args.batch_size)
+    print(f"Перенесено в архив: {moved}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
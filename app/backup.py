@@ -0,0 +1,393 @@
+"""
+Онлайн-резервные копии SQLite.
+
+Копия снимается через online backup API небольшими порциями страниц с паузой
+между ними. Приложение переводит базу в WAL, и все порции читаются внутри одной
+транзакции чтения: копия согласована, не перезапускается от записи из других
+соединений и не блокирует писателей. Для базы без WAL запись начинает копию
+заново; после BACKUP_MAX_RESTARTS перезапусков она снимается за один шаг.
+Инкрементальный снимок тоже снимается через backup API во временный файл, но в
+каталог копий сохраняются только страницы, изменившиеся с прошлого снимка.
+
+Если архив комментариев вынесен в отдельный файл (ARCHIVE_DATABASE_PATH), он
+копируется вместе с основной базой в одной транзакции чтения и хранится в
+подкаталоге archive со своей цепочкой снимков.
+"""
+
+import asyncio
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import struct
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+from app.database import ARCHIVE_DATABASE_PATH, engine
+
+# Настройки резервного копирования
+BACKUP_DIR = os.getenv("BACKUP_DIR", "./backups")
+BACKUP_PAGES = int(os.getenv("BACKUP_PAGES", "64"))
+BACKUP_SLEEP = float(os.getenv("BACKUP_SLEEP", "0.005"))
+BACKUP_MAX_RESTARTS = int(os.getenv("BACKUP_MAX_RESTARTS", "3"))
+BACKUP_TOKEN = os.getenv("BACKUP_TOKEN")
+
+MANIFEST = "manifest.json"
+PAGE_HASHES = "pages.hashes"
+HASH_SIZE = 8
+PAGE_HEADER = struct.Struct(">I")
+ARCHIVE_DIR = "archive"
+
+# Одновременно выполняется только одно копирование
+_lock = asyncio.Lock()
+
+
+def database_path() -> str:
+    """Путь к файлу SQLite из DATABASE_URL"""
+    url = engine.url
+    if url.get_backend_name() != "sqlite" or not url.database or url.database == ":memory:":
+        raise RuntimeError("Online backups are supported only for file-based SQLite databases")
+    return url.database
+
+
+class _CopyRestarted(Exception):
+    pass
+
+
+def _is_wal(connection: sqlite3.Connection, schema: str = "main") -> bool:
+    return connection.execute(f"PRAGMA {schema}.journal_mode").fetchone()[0] == "wal"
+
+
+def _begin_read(connection: sqlite3.Connection, schemas=("main",)) -> None:
+    """Открыть транзакцию чтения: снимок фиксируется при первом обращении к файлу"""
+    connection.execute("BEGIN")
+    for schema in schemas:
+        connection.execute(f"SELECT count(*) FROM {schema}.sqlite_master").fetchone()
+
+
+def online_copy(
+        source: str,
+        target: str,
+        pages: int = BACKUP_PAGES,
+        sleep: float = BACKUP_SLEEP,
+        max_restarts: int = BACKUP_MAX_RESTARTS
+) -> int:
+    """Согласованная копия базы порциями по pages страниц; возвращает число перезапусков"""
+    src = sqlite3.connect(source, isolation_level=None)
+    dst = sqlite3.connect(target)
+    try:
+        if _is_wal(src):
+            # В WAL все порции читаются из одного снимка: запись из других
+            # соединений не перезапускает копию и не ждёт её
+            _begin_read(src)
+            try:
+                src.backup(dst, pages=pages, sleep=sleep)
+            finally:
+                src.execute("COMMIT")
+            return 0
+        return _copy_rollback_journal(src, dst, pages, sleep, max_restarts)
+    finally:
+        dst.close()
+        src.close()
+
+
+def _copy_rollback_journal(
+        src: sqlite3.Connection,
+        dst: sqlite3.Connection,
+        pages: int,
+        sleep: float,
+        max_restarts: int
+) -> int:
+    """Копия базы без WAL (например, ещё не открытой приложением)"""
+    restarts = 0
+    previous = None
+
+    def progress(status, remaining, total):
+        nonlocal restarts, previous
+        # Запись из другого соединения начинает копирование с первой страницы
+        if previous is not None and remaining > previous:
+            restarts += 1
+            if restarts > max_restarts:
+                raise _CopyRestarted
+        previous = remaining
+
+    try:
+        # Между шагами блокировка чтения отпускается, писатели не ждут всю копию
+        src.backup(dst, pages=pages, progress=progress, sleep=sleep)
+    except _CopyRestarted:
+        # Под постоянной записью порциями копия не завершится: один шаг,
+        # писатели ждут время одного прохода по файлу
+        src.backup(dst, pages=-1)
+    return restarts
+
+
+def copy_with_archive(
+        source: str,
+        target: str,
+        archive: str,
+        archive_target: str,
+        pages: int = BACKUP_PAGES,
+        sleep: float = BACKUP_SLEEP
+) -> None:
+    """Копия основной базы и файла архива из одного состояния.
+
+    Архиватор переносит комментарии между файлами одной транзакцией, поэтому
+    оба файла копируются внутри общей транзакции чтения: в WAL порциями,
+    без WAL — за один шаг каждый.
+    """
+    src = sqlite3.connect(source, isolation_level=None)
+    try:
+        src.execute("ATTACH DATABASE ? AS archive", (archive,))
+        step = pages if _is_wal(src) and _is_wal(src, "archive") else -1
+        _begin_read(src, ("main", "archive"))
+        try:
+            for name, path in (("main", target), ("archive", archive_target)):
+                dst = sqlite3.connect(path)
+                try:
+                    src.backup(dst, name=name, pages=step, sleep=sleep)
+                finally:
+                    dst.close()
+        finally:
+            src.execute("COMMIT")
+    finally:
+        src.close()
+
+
+def _page_size(path: str) -> int:
+    connection = sqlite3.connect(path)
+    try:
+        return connection.execute("PRAGMA page_size").fetchone()[0]
+    finally:
+        connection.close()
+
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _page_hashes(path: str, page_size: int) -> List[bytes]:
+    hashes = []
+    with open(path, "rb") as f:
+        for page in iter(lambda: f.read(page_size), b""):
+            hashes.append(hashlib.blake2b(page, digest_size=HASH_SIZE).digest())
+    return hashes
+
+
+class BackupStore:
+    """Каталог снимков: полные копии и дельты страниц с общим манифестом"""
+
+    def __init__(self, directory: str = BACKUP_DIR):
+        self.directory = Path(directory)
+
+    def _manifest(self) -> dict:
+        path = self.directory / MANIFEST
+        if not path.exists():
+            return {"snapshots": []}
+        return json.loads(path.read_text())
+
+    def _save_manifest(self, manifest: dict) -> None:
+        path = self.directory / MANIFEST
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(manifest, indent=2))
+        os.replace(tmp, path)
+
+    def snapshots(self) -> List[dict]:
+        return self._manifest()["snapshots"]
+
+    def archive_store(self) -> "BackupStore":
+        """Снимки файла архива комментариев"""
+        return BackupStore(str(self.directory / ARCHIVE_DIR))
+
+    def snapshot(self, source: str, incremental: bool = True, archive: Optional[str] = None) -> dict:
+        """Снять полный или инкрементальный снимок базы (и файла архива, если он есть)"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        started = time.perf_counter()
+        with tempfile.TemporaryDirectory(dir=self.directory) as tmp:
+            copy = os.path.join(tmp, "copy.db")
+            extra = {}
+            if archive is None:
+                extra["restarts"] = online_copy(source, copy)
+            else:
+                archive_copy = os.path.join(tmp, "archive.db")
+                copy_with_archive(source, copy, archive, archive_copy)
+                extra["archive_id"] = self.archive_store()._store(archive_copy, incremental, started)["id"]
+            return self._store(copy, incremental, started, **extra)
+
+    def _store(self, copy: str, incremental: bool, started: float, **extra) -> dict:
+        """Сохранить снятую копию целиком или только изменённые страницы"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        manifest = self._manifest()
+        snapshots = manifest["snapshots"]
+        snapshot_id = snapshots[-1]["id"] + 1 if snapshots else 1
+
+        page_size = _page_size(copy)
+        hashes = _page_hashes(copy, page_size)
+        size = os.path.getsize(copy)
+        sha256 = _sha256(copy)
+
+        previous = self._load_hashes()
+        kind = "delta" if incremental and previous and snapshots[-1]["page_size"] == page_size else "full"
+        if kind == "full":
+            filename = f"{snapshot_id:04d}.db"
+            shutil.move(copy, self.directory / filename)
+            changed = len(hashes)
+        else:
+            filename = f"{snapshot_id:04d}.delta"
+            changed = self._write_delta(copy, self.directory / filename, page_size, hashes, previous)
+
+        self._save_hashes(hashes)
+        entry = {
+            "id": snapshot_id,
+            "kind": kind,
+            "file": filename,
+            "created_at": datetime.utcnow().isoformat(),
+            "page_size": page_size,
+            "page_count": len(hashes),
+            "changed_pages": changed,
+            "database_bytes": size,
+            "stored_bytes": os.path.getsize(self.directory / filename),
+            "sha256": sha256,
+            "seconds": round(time.perf_counter() - started, 3),
+            **extra,
+        }
+        snapshots.append(entry)
+        self._save_manifest(manifest)
+        return entry
+
+    @staticmethod
+    def _write_delta(copy: str, target: Path, page_size: int, hashes: List[bytes], previous: List[bytes]) -> int:
+        changed = 0
+        with open(copy, "rb") as src, open(target, "wb") as out:
+            for page_no, page_hash in enumerate(hashes):
+                if page_no < len(previous) and previous[page_no] == page_hash:
+                    continue
+                src.seek(page_no * page_size)
+                out.write(PAGE_HEADER.pack(page_no))
+                out.write(src.read(page_size))
+                changed += 1
+        return changed
+
+    def _load_hashes(self) -> List[bytes]:
+        path = self.directory / PAGE_HASHES
+        if not path.exists():
+            return []
+        data = path.read_bytes()
+        return [data[i:i + HASH_SIZE] for i in range(0, len(data), HASH_SIZE)]
+
+    def _save_hashes(self, hashes: List[bytes]) -> None:
+        path = self.directory / PAGE_HASHES
+        tmp = path.with_suffix(".tmp")
+        tmp.write_bytes(b"".join(hashes))
+        os.replace(tmp, path)
+
+    def restore(self, snapshot_id: int, target: str, archive_target: Optional[str] = None) -> dict:
+        """Восстановить снимок в файл target: полная копия и дельты после неё"""
+        snapshots = self.snapshots()
+        chain = []
+        for entry in snapshots:
+            if entry["id"] > snapshot_id:
+                break
+            chain = [entry] if entry["kind"] == "full" else chain + [entry]
+        if not chain or chain[-1]["id"] != snapshot_id:
+            raise ValueError(f"Snapshot {snapshot_id} not found")
+        archive_id = chain[-1].get("archive_id")
+        if archive_id is not None and archive_target is None:
+            raise ValueError(f"Snapshot {snapshot_id} includes the comment archive, archive target is required")
+
+        shutil.copyfile(self.directory / chain[0]["file"], target)
+        with open(target, "r+b") as out:
+            for entry in chain[1:]:
+                page_size = entry["page_size"]
+                with open(self.directory / entry["file"], "rb") as delta:
+                    while header := delta.read(PAGE_HEADER.size):
+                        (page_no,) = PAGE_HEADER.unpack(header)
+                        out.seek(page_no * page_size)
+                        out.write(delta.read(page_size))
+                out.truncate(entry["page_count"] * page_size)
+        if archive_id is not None:
+            self.archive_store().restore(archive_id, archive_target)
+        return chain[-1]
+
+    def verify(self, snapshot_id: int) -> dict:
+        """Восстановить снимок во временный файл и проверить его целостность"""
+        with tempfile.TemporaryDirectory() as tmp:
+            target = os.path.join(tmp, "restore.db")
+            entry = self.restore(snapshot_id, target, os.path.join(tmp, "archive.db"))
+            checksum_ok = _sha256(target) == entry["sha256"]
+            connection = sqlite3.connect(target)
+            try:
+                integrity = connection.execute("PRAGMA integrity_check").fetchone()[0]
+            finally:
+                connection.close()
+        result = {
+            "id": snapshot_id,
+            "checksum_ok": checksum_ok,
+            "integrity": integrity,
+            "ok": checksum_ok and integrity == "ok",
+        }
+        if "archive_id" in entry:
+            result["archive"] = self.archive_store().verify(entry["archive_id"])
+            result["ok"] = result["ok"] and result["archive"]["ok"]
+        return result
+
+
+store = BackupStore()
+
+
+async def create_backup(incremental: bool = True, backup_store: Optional[BackupStore] = None) -> dict:
+    """Снять снимок в отдельном потоке, не блокируя цикл событий"""
+    backup_store = backup_store or store
+    async with _lock:
+        return await asyncio.to_thread(backup_store.snapshot, database_path(), incremental, ARCHIVE_DATABASE_PATH)
+
+
+async def verify_backup(snapshot_id: int, backup_store: Optional[BackupStore] = None) -> dict:
+    """Проверить снимок в отдельном потоке"""
+    backup_store = backup_store or store
+    return await asyncio.to_thread(backup_store.verify, snapshot_id)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Резервные копии базы SQLite")
+    parser.add_argument("--dir", default=BACKUP_DIR, help="Каталог снимков")
+    commands = parser.add_subparsers(dest="command", required=True)
+    backup = commands.add_parser("backup", help="Снять снимок")
+    backup.add_argument("--full", action="store_true", help="Полная копия вместо дельты")
+    commands.add_parser("list", help="Список снимков")
+    verify = commands.add_parser("verify", help="Проверить снимок")
+    verify.add_argument("id", type=int)
+    restore = commands.add_parser("restore", help="Восстановить снимок в файл")
+    restore.add_argument("id", type=int)
+    restore.add_argument("target")
+    restore.add_argument("--archive-target", help="Файл для архива комментариев, если он есть в снимке")
+    args = parser.parse_args()
+
+    backup_store = BackupStore(args.dir)
+    if args.command == "backup":
+        result = backup_store.snapshot(database_path(), incremental=not args.full, archive=ARCHIVE_DATABASE_PATH)
+    elif args.command == "list":
+        result = backup_store.snapshots()
+    elif args.command == "verify":
+        result = backup_store.verify(args.id)
+    else:
+        for target in (args.target, args.archive_target):
+            if target and os.path.exists(target):
+                parser.error(f"{target} already exists")
+        try:
+            result = backup_store.restore(args.id, args.target, args.archive_target)
+        except ValueError as e:
+            parser.error(str(e))
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
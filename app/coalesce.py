@@ -0,0 +1,102 @@
+import asyncio
+import os
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+from app.profiling import follow_task
+
+# Настройки объединения одинаковых запросов
+COALESCE_ENABLED = os.getenv("COALESCE_ENABLED", "true").lower() in ("1", "true", "yes")
+COALESCE_TIMEOUT = float(os.getenv("COALESCE_TIMEOUT", "5"))
+
+
+class CoalesceTimeout(Exception):
+    """Объединённый вызов не завершился за отведённое ожидающим время"""
+
+
+class SingleFlight:
+    """Объединение одинаковых одновременных чтений.
+
+    Пока запрос с данным ключом выполняется, остальные такие же запросы
+    ждут его результат (или исключение) вместо повторного обращения к БД.
+    Работа выполняется в отдельной задаче, поэтому отмена первого запроса
+    не затрагивает ожидающих. Ожидающие, не дождавшиеся результата за
+    timeout, получают CoalesceTimeout, а не повторяют работу сами: иначе
+    при перегрузке все они одновременно обратились бы к БД.
+    """
+
+    def __init__(self, timeout: float = COALESCE_TIMEOUT, enabled: bool = COALESCE_ENABLED):
+        self.timeout = timeout
+        self.enabled = enabled
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+        # Ключи запросов (путь и строка запроса) выполняющихся вызовов
+        self._requests: Dict[Hashable, Hashable] = {}
+        self.executed = 0
+        self.collapsed = 0
+        self.timeouts = 0
+        self.errors = 0
+
+    async def do(
+            self,
+            key: Hashable,
+            fn: Callable[[], Awaitable[Any]],
+            request: Optional[Hashable] = None
+    ) -> Any:
+        """Выполнить fn или присоединиться к уже выполняющемуся вызову с тем же ключом.
+
+        request — ключ HTTP-запроса (request_key), по которому до маршрутизации
+        можно узнать, что такой вызов уже выполняется.
+        """
+        if not self.enabled:
+            return await fn()
+
+        task = self._in_flight.get(key)
+        if task is None:
+            self.executed += 1
+            task = asyncio.ensure_future(fn())
+            self._in_flight[key] = task
+            if request is not None:
+                self._requests[request] = key
+            task.add_done_callback(lambda done: self._finish(key, done, request))
+            # Работа идёт в отдельной задаче: профиль запроса должен её видеть
+            follow_task(task)
+            return await asyncio.shield(task)
+
+        self.collapsed += 1
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), self.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise CoalesceTimeout(key) from None
+
+    def joinable(self, request: Hashable) -> bool:
+        """Выполняется ли уже вызов для такого же HTTP-запроса"""
+        key = self._requests.get(request)
+        return key is not None and key in self._in_flight
+
+    def _finish(self, key: Hashable, task: asyncio.Task, request: Optional[Hashable] = None) -> None:
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        if request is not None and self._requests.get(request) == key:
+            del self._requests[request]
+        if not task.cancelled() and task.exception() is not None:
+            self.errors += 1
+
+    def stats(self) -> dict:
+        """Метрики объединения запросов"""
+        return {
+            "enabled": self.enabled,
+            "in_flight": len(self._in_flight),
+            "executed": self.executed,
+            "collapsed": self.collapsed,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+        }
+
+
+def request_key(scope: dict) -> tuple:
+    """Ключ HTTP-запроса для SingleFlight.joinable: путь и строка запроса"""
+    return scope["path"], scope.get("query_string", b"")
+
+
+# Общий объединитель чтений процесса
+coalescer = SingleFlight()
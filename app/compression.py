@@ -0,0 +1,245 @@
+import asyncio
+import gzip
+import hashlib
+import os
+import re
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Настройки сжатия ответов
+COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "true").lower() in ("1", "true", "yes")
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+COMPRESSION_OFFLOAD_SIZE = int(os.getenv("COMPRESSION_OFFLOAD_SIZE", "16384"))
+COMPRESSION_WORKERS = int(os.getenv("COMPRESSION_WORKERS", "2"))
+COMPRESSION_CACHE_BYTES = int(os.getenv("COMPRESSION_CACHE_BYTES", str(32 * 1024 * 1024)))
+
+# Кэшируются детальная страница поста и первые страницы списка
+CACHEABLE_PATHS = re.compile(r"^/api/posts(/\d+)?$")
+CACHEABLE_QUERY = re.compile(r"^(|.*&)page=1(&.*|)$")
+
+
+def _gzip(level: int) -> Callable[[bytes], bytes]:
+    return lambda body: gzip.compress(body, compresslevel=level, mtime=0)
+
+
+def _brotli(quality: int) -> Callable[[bytes], bytes]:
+    return lambda body: brotli.compress(body, quality=quality)
+
+
+def _zstd(level: int) -> Callable[[bytes], bytes]:
+    compressor = zstandard.ZstdCompressor(level=level)
+    return compressor.compress
+
+
+# Кодировки в порядке предпочтения сервера: (для каждого ответа, для кэша).
+# Кэшируемые ответы сжимаются один раз, поэтому с более высоким уровнем
+ENCODINGS: Dict[str, Tuple[Callable[[bytes], bytes], Callable[[bytes], bytes]]] = {}
+if brotli is not None:
+    ENCODINGS["br"] = (_brotli(4), _brotli(9))
+if zstandard is not None:
+    ENCODINGS["zstd"] = (_zstd(3), _zstd(10))
+ENCODINGS["gzip"] = (_gzip(6), _gzip(9))
+
+
+def negotiate(accept_encoding: str) -> Optional[str]:
+    """Выбрать кодировку по Accept-Encoding с учётом q-значений"""
+    accepted = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        name = name.strip().lower()
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                continue
+        if name:
+            accepted[name] = quality
+
+    best, best_quality = None, 0.0
+    for encoding in ENCODINGS:
+        quality = accepted.get(encoding, accepted.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+class CompressedCache:
+    """LRU сжатых тел ответов.
+
+    Версия ресурса — хеш несжатого тела: любое изменение поста, его темы или
+    комментариев даёт новую версию, отдельная инвалидация не нужна.
+    """
+
+    def __init__(self, max_bytes: int = COMPRESSION_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple, version: bytes) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] != version:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key: tuple, version: bytes, body: bytes) -> None:
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self.size -= len(previous[1])
+        if len(body) > self.max_bytes:
+            return
+        self._entries[key] = (version, body)
+        self.size += len(body)
+        while self.size > self.max_bytes:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self.size -= len(evicted)
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "bytes": self.size,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+class CompressionStats:
+    def __init__(self):
+        self.responses = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.compress_seconds = 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "responses": self.responses,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "bytes_saved": self.bytes_in - self.bytes_out,
+            "compress_seconds": round(self.compress_seconds, 3),
+        }
+
+
+cache = CompressedCache()
+stats = CompressionStats()
+_executor = ThreadPoolExecutor(max_workers=COMPRESSION_WORKERS, thread_name_prefix="compress")
+
+
+def compression_stats() -> dict:
+    """Метрики сжатия и кэша сжатых ответов"""
+    return {"enabled": COMPRESSION_ENABLED, **stats.as_dict(), "cache": cache.stats()}
+
+
+async def compress(body: bytes, encoding: str, cacheable: bool = False) -> bytes:
+    """Сжать тело; крупные тела сжимаются в пуле потоков, вне цикла событий"""
+    compressor = ENCODINGS[encoding][1 if cacheable else 0]
+    start = time.perf_counter()
+    if len(body) >= COMPRESSION_OFFLOAD_SIZE:
+        compressed = await asyncio.get_running_loop().run_in_executor(_executor, compressor, body)
+    else:
+        compressed = compressor(body)
+    stats.compress_seconds += time.perf_counter() - start
+    return compressed
+
+
+class CompressionMiddleware:
+    """Сжатие ответов gzip/br/zstd с кэшем сжатых тел для горячих ответов"""
+
+    def __init__(self, app, enabled: bool = COMPRESSION_ENABLED, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.enabled = enabled
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if not self.enabled or scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            return await self.app(scope, receive, send)
+
+        start_message = None
+        chunks = []
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start_message, passthrough
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                # Уже сжатые ответы и потоки SSE не буферизуются
+                if "content-encoding" in headers or headers.get("content-type", "").startswith("text/event-stream"):
+                    passthrough = True
+                    await send(message)
+                else:
+                    start_message = message
+                return
+
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            chunks.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+
+            body = b"".join(chunks)
+            if len(body) < self.minimum_size:
+                await send(start_message)
+                await send({"type": "http.response.body", "body": body})
+                return
+
+            compressed = await self._compress(scope, start_message["status"], body, encoding)
+            # Копия заголовков: список приложения не меняем, объект ответа
+            # может отправляться не одним запросом
+            headers = MutableHeaders(raw=list(start_message["headers"]))
+            headers["content-encoding"] = encoding
+            headers["content-length"] = str(len(compressed))
+            headers.add_vary_header("Accept-Encoding")
+            await send({**start_message, "headers": headers.raw})
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_compressed)
+
+    async def _compress(self, scope, status: int, body: bytes, encoding: str) -> bytes:
+        stats.responses += 1
+        stats.bytes_in += len(body)
+        query = scope.get("query_string", b"").decode("latin-1")
+        cacheable = (
+            scope["method"] == "GET"
+            and status == 200
+            and CACHEABLE_PATHS.match(scope["path"]) is not None
+            and (scope["path"] != "/api/posts" or not query or CACHEABLE_QUERY.match(query) is not None)
+        )
+
+        if not cacheable:
+            compressed = await compress(body, encoding)
+        else:
+            key = (scope["path"], query, encoding)
+            version = hashlib.blake2b(body, digest_size=16).digest()
+            compressed = cache.get(key, version)
+            if compressed is None:
+                compressed = await compress(body, encoding, cacheable=True)
+                cache.put(key, version, compressed)
+
+        stats.bytes_out += len(compressed)
+        return compressed
@@ -1,33 +1,48 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.future import select
-from sqlalchemy.orm import selectinload
-from sqlalchemy import func, desc
+from sqlalchemy.orm.attributes import set_committed_value
 from typing import Optional, List
 from datetime import datetime
 
-from app.models import Post, Comment, Topic
+from app.archive import archive_state
+from app.events import Event, hub, post_channel, topic_channel
+from app.fields import FieldSet
+from app.models import Post, Comment, CommentArchive, Topic
 from app.schemas import PostCreate, PostUpdate, CommentCreate, CommentUpdate, TopicCreate, TopicUpdate
+from app import queries, schemas
 
 
 class TopicCRUD:
     @staticmethod
-    async def get_topic(db: AsyncSession, topic_id: int) -> Optional[Topic]:
+    async def get_topic(
+            db: AsyncSession,
+            topic_id: int,
+            fields: Optional[FieldSet] = None
+    ) -> Optional[Topic]:
         """Получить тему по ID"""
-        result = await db.execute(select(Topic).where(Topic.id == topic_id))
+        query = queries.TOPIC_BY_ID
+        if fields is not None:
+            query = queries.with_fields(query, Topic, fields, queries.TOPIC_RELATIONSHIPS)
+        result = await db.execute(query, {"topic_id": topic_id})
         return result.scalar_one_or_none()
 
     @staticmethod
-    async def get_topics(db: AsyncSession, skip: int = 0, limit: int = 100) -> List[Topic]:
+    async def get_topics(
+            db: AsyncSession,
+            skip: int = 0,
+            limit: int = 100,
+            fields: Optional[FieldSet] = None
+    ) -> List[Topic]:
         """Получить список тем"""
-        result = await db.execute(
-            select(Topic).offset(skip).limit(limit).order_by(Topic.name)
-        )
+        query = queries.TOPICS
+        if fields is not None:
+            query = queries.with_fields(query, Topic, fields, queries.TOPIC_RELATIONSHIPS)
+        result = await db.execute(query, {"skip": skip, "limit": limit})
         return result.scalars().all()
 
     @staticmethod
     async def get_topic_by_name(db: AsyncSession, name: str) -> Optional[Topic]:
         """Получить тему по имени"""
-        result = await db.execute(select(Topic).where(Topic.name == name))
+        result = await db.execute(queries.TOPIC_BY_NAME, {"name": name})
         return result.scalar_one_or_none()
 
     @staticmethod
@@ -61,6 +76,8 @@ class TopicCRUD:
         if db_topic is None:
             return False
 
+        # Архивные комментарии не входят в каскад ORM
+        await db.execute(queries.DELETE_ARCHIVED_BY_TOPIC, {"topic_id": topic_id})
         await db.delete(db_topic)
         await db.commit()
         return True
@@ -68,40 +85,68 @@ class TopicCRUD:
 
 class PostCRUD:
     @staticmethod
-    async def get_post(db: AsyncSession, post_id: int) -> Optional[Post]:
+    async def get_post(
+            db: AsyncSession,
+            post_id: int,
+            fields: Optional[FieldSet] = None
+    ) -> Optional[Post]:
         """Получить пост по ID с темой и комментариями"""
-        result = await db.execute(
-            select(Post)
-            .options(selectinload(Post.topic), selectinload(Post.comments))
-            .where(Post.id == post_id)
-        )
+        if fields is None:
+            query = queries.POST_BY_ID
+        else:
+            query = queries.with_fields(
+                queries.POST_BY_ID_BARE, Post, fields, queries.POST_RELATIONSHIPS
+            )
+        result = await db.execute(query, {"post_id": post_id})
+        db_post = result.scalar_one_or_none()
+
+        if db_post is not None and (fields is None or "comments" in fields.relationships):
+            await PostCRUD._attach_archived_comments(db, db_post)
+        return db_post
+
+    @staticmethod
+    async def _get_post_for_write(db: AsyncSession, post_id: int) -> Optional[Post]:
+        """Пост для изменения: только горячие комментарии, без архива"""
+        result = await db.execute(queries.POST_BY_ID, {"post_id": post_id})
         return result.scalar_one_or_none()
 
+    @staticmethod
+    async def _attach_archived_comments(db: AsyncSession, post: Post) -> None:
+        """Добавить к комментариям поста архивные (только для чтения)"""
+        if not await archive_state.active(db):
+            return
+        result = await db.execute(queries.ALL_ARCHIVED_COMMENTS_BY_POST, {"post_id": post.id})
+        archived = result.scalars().all()
+        if archived:
+            set_committed_value(post, "comments", [*archived, *post.comments])
+
     @staticmethod
     async def get_posts(
             db: AsyncSession,
             skip: int = 0,
             limit: int = 100,
-            topic_id: Optional[int] = None
+            topic_id: Optional[int] = None,
+            fields: Optional[FieldSet] = None
     ) -> tuple[List[Post], int]:
         """Получить список постов с пагинацией"""
-        query = select(Post).options(selectinload(Post.topic))
-
+        params = {"skip": skip, "limit": limit}
         if topic_id:
-            query = query.where(Post.topic_id == topic_id)
+            params["topic_id"] = topic_id
+            query, count_query = queries.POSTS_BY_TOPIC, queries.POSTS_BY_TOPIC_COUNT
+            bare_query = queries.POSTS_BY_TOPIC_BARE
+        else:
+            query, count_query = queries.POSTS, queries.POSTS_COUNT
+            bare_query = queries.POSTS_BARE
 
-        # Подсчёт общего количества
-        count_query = select(func.count(Post.id))
-        if topic_id:
-            count_query = count_query.where(Post.topic_id == topic_id)
+        if fields is not None:
+            query = queries.with_fields(bare_query, Post, fields, queries.POST_RELATIONSHIPS)
 
-        total_result = await db.execute(count_query)
+        # Подсчёт общего количества
+        total_result = await db.execute(count_query, params)
         total = total_result.scalar()
 
         # Получение постов с сортировкой по дате создания (новые первыми)
-        result = await db.execute(
-            query.order_by(desc(Post.created_at)).offset(skip).limit(limit)
-        )
+        result = await db.execute(query, params)
         posts = result.scalars().all()
 
         return posts, total
@@ -115,17 +160,37 @@ class PostCRUD:
         await db.refresh(db_post)
 
         # Загружаем связанную тему
+        result = await db.execute(queries.POST_BY_ID, {"post_id": db_post.id})
+        db_post = result.scalar_one()
+
+        # Оповещаем подписчиков темы после коммита
+        hub.publish(topic_channel(db_post.topic_id), PostCRUD.to_event(db_post))
+        return db_post
+
+    @staticmethod
+    def to_event(post: Post) -> Event:
+        """Событие SSE о новом посте"""
+        data = schemas.PostSummary.model_validate(post).model_dump_json()
+        return Event(post.id, "post", data)
+
+    @staticmethod
+    async def get_post_events(
+            db: AsyncSession,
+            topic_id: int,
+            after_id: int,
+            limit: int = 100
+    ) -> List[Event]:
+        """Посты темы, созданные после события after_id (для Last-Event-ID)"""
         result = await db.execute(
-            select(Post)
-            .options(selectinload(Post.topic), selectinload(Post.comments))
-            .where(Post.id == db_post.id)
+            queries.POST_EVENTS,
+            {"topic_id": topic_id, "after_id": after_id, "limit": limit}
         )
-        return result.scalar_one()
+        return [PostCRUD.to_event(post) for post in result.scalars().all()]
 
     @staticmethod
     async def update_post(db: AsyncSession, post_id: int, post: PostUpdate) -> Optional[Post]:
         """Обновить пост"""
-        db_post = await PostCRUD.get_post(db, post_id)
+        db_post = await PostCRUD._get_post_for_write(db, post_id)
         if db_post is None:
             return None
 
@@ -138,20 +203,20 @@ class PostCRUD:
         await db.refresh(db_post)
 
         # Перезагружаем с связями
-        result = await db.execute(
-            select(Post)
-            .options(selectinload(Post.topic), selectinload(Post.comments))
-            .where(Post.id == db_post.id)
-        )
-        return result.scalar_one()
+        result = await db.execute(queries.POST_BY_ID, {"post_id": db_post.id})
+        db_post = result.scalar_one()
+        await PostCRUD._attach_archived_comments(db, db_post)
+        return db_post
 
     @staticmethod
     async def delete_post(db: AsyncSession, post_id: int) -> bool:
         """Удалить пост"""
-        db_post = await PostCRUD.get_post(db, post_id)
+        db_post = await PostCRUD._get_post_for_write(db, post_id)
         if db_post is None:
             return False
 
+        # Архивные комментарии не входят в каскад ORM
+        await db.execute(queries.DELETE_ARCHIVED_BY_POST, {"post_id": post_id})
         await db.delete(db_post)
         await db.commit()
         return True
@@ -159,27 +224,65 @@ class PostCRUD:
 
 class CommentCRUD:
     @staticmethod
-    async def get_comment(db: AsyncSession, comment_id: int) -> Optional[Comment]:
-        """Получить комментарий по ID"""
-        result = await db.execute(select(Comment).where(Comment.id == comment_id))
-        return result.scalar_one_or_none()
+    async def get_comment(
+            db: AsyncSession,
+            comment_id: int,
+            fields: Optional[FieldSet] = None
+    ) -> Optional[Comment]:
+        """Получить комментарий по ID (из основной таблицы или архива)"""
+        query = queries.COMMENT_BY_ID
+        archive_query = queries.ARCHIVED_COMMENT_BY_ID
+        if fields is not None:
+            query = queries.with_fields(query, Comment, fields, queries.COMMENT_RELATIONSHIPS)
+            archive_query = queries.with_fields(
+                archive_query, CommentArchive, fields, queries.COMMENT_ARCHIVE_RELATIONSHIPS
+            )
+        result = await db.execute(query, {"comment_id": comment_id})
+        db_comment = result.scalar_one_or_none()
+        if db_comment is None and await archive_state.active(db):
+            result = await db.execute(archive_query, {"comment_id": comment_id})
+            db_comment = result.scalar_one_or_none()
+        return db_comment
 
     @staticmethod
     async def get_comments_by_post(
             db: AsyncSession,
             post_id: int,
             skip: int = 0,
-            limit: int = 100
+            limit: int = 100,
+            fields: Optional[FieldSet] = None
     ) -> List[Comment]:
-        """Получить комментарии к посту"""
-        result = await db.execute(
-            select(Comment)
-            .where(Comment.post_id == post_id)
-            .order_by(Comment.created_at)
-            .offset(skip)
-            .limit(limit)
-        )
-        return result.scalars().all()
+        """Получить комментарии к посту из архива и основной таблицы"""
+        query = queries.COMMENTS_BY_POST
+        archive_query = queries.ARCHIVED_COMMENTS_BY_POST
+        if fields is not None:
+            query = queries.with_fields(query, Comment, fields, queries.COMMENT_RELATIONSHIPS)
+            archive_query = queries.with_fields(
+                archive_query, CommentArchive, fields, queries.COMMENT_ARCHIVE_RELATIONSHIPS
+            )
+
+        # Архивные комментарии всегда старше горячих, поэтому идут первыми
+        archived = 0
+        if await archive_state.active(db):
+            count_result = await db.execute(queries.ARCHIVED_COMMENTS_COUNT, {"post_id": post_id})
+            archived = count_result.scalar()
+
+        comments = []
+        if skip < archived:
+            result = await db.execute(
+                archive_query,
+                {"post_id": post_id, "skip": skip, "limit": limit}
+            )
+            comments.extend(result.scalars().all())
+
+        remaining = limit - len(comments)
+        if remaining > 0:
+            result = await db.execute(
+                query,
+                {"post_id": post_id, "skip": max(skip - archived, 0), "limit": remaining}
+            )
+            comments.extend(result.scalars().all())
+        return comments
 
     @staticmethod
     async def create_comment(db: AsyncSession, comment: CommentCreate, post_id: int) -> Comment:
@@ -188,8 +291,31 @@ class CommentCRUD:
         db.add(db_comment)
         await db.commit()
         await db.refresh(db_comment)
+
+        # Оповещаем подписчиков поста после коммита
+        hub.publish(post_channel(post_id), CommentCRUD.to_event(db_comment))
         return db_comment
 
+    @staticmethod
+    def to_event(comment: Comment) -> Event:
+        """Событие SSE о новом комментарии"""
+        data = schemas.Comment.model_validate(comment).model_dump_json()
+        return Event(comment.id, "comment", data)
+
+    @staticmethod
+    async def get_comment_events(
+            db: AsyncSession,
+            post_id: int,
+            after_id: int,
+            limit: int = 100
+    ) -> List[Event]:
+        """Комментарии к посту после события after_id (для Last-Event-ID)"""
+        result = await db.execute(
+            queries.COMMENT_EVENTS,
+            {"post_id": post_id, "after_id": after_id, "limit": limit}
+        )
+        return [CommentCRUD.to_event(comment) for comment in result.scalars().all()]
+
     @staticmethod
     async def update_comment(db: AsyncSession, comment_id: int, comment: CommentUpdate) -> Optional[Comment]:
         """Обновить комментарий"""
@@ -1,17 +1,51 @@
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from sqlalchemy.orm import DeclarativeBase
 import os
 
 # Настройки базы данных
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./blog.db")
 
+# Отдельный файл SQLite для архива комментариев (подключается через ATTACH)
+ARCHIVE_DATABASE_PATH = os.getenv("ARCHIVE_DATABASE_PATH")
+ARCHIVE_SCHEMA = "archive" if ARCHIVE_DATABASE_PATH else None
+
+# Пул соединений: постоянная часть покрывает лимиты допуска на чтение и запись
+# (ADMISSION_READ_LIMIT + ADMISSION_WRITE_LIMIT), запас — маршруты без лимитов
+# (проверки потоков SSE, служебные) и фоновые задачи
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "20"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+
+pool_options = {}
+if ":memory:" not in DATABASE_URL:
+    pool_options = {
+        "poolclass": AsyncAdaptedQueuePool,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+    }
+
 # Создание асинхронного движка
 engine = create_async_engine(
     DATABASE_URL,
     echo=True,  # Логирование SQL запросов в dev режиме
-    future=True
+    future=True,
+    execution_options={"schema_translate_map": {"archive": ARCHIVE_SCHEMA}},
+    **pool_options
 )
 
+
+if engine.dialect.name == "sqlite" and ":memory:" not in DATABASE_URL:
+    @event.listens_for(engine.sync_engine, "connect")
+    def _configure_sqlite(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        # WAL: читатели, в том числе онлайн-копия базы, не блокируют писателей
+        cursor.execute("PRAGMA journal_mode=WAL")
+        if ARCHIVE_DATABASE_PATH:
+            cursor.execute("ATTACH DATABASE ? AS archive", (ARCHIVE_DATABASE_PATH,))
+            cursor.execute("PRAGMA archive.journal_mode=WAL")
+        cursor.close()
+
 # Фабрика сессий
 AsyncSessionLocal = async_sessionmaker(
     engine,
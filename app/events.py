@@ -0,0 +1,148 @@
+import asyncio
+import os
+from typing import AsyncIterator, Awaitable, Callable, Dict, Hashable, List, NamedTuple, Optional, Set
+
+from fastapi import Request
+
+from app.database import AsyncSessionLocal
+
+# Настройки потоков событий
+SSE_QUEUE_SIZE = int(os.getenv("SSE_QUEUE_SIZE", "100"))
+SSE_KEEPALIVE = float(os.getenv("SSE_KEEPALIVE", "15"))
+SSE_REPLAY_BATCH = 100
+
+
+class Event(NamedTuple):
+    """Событие для Server-Sent Events"""
+    id: int
+    event: str
+    data: str
+
+    def encode(self) -> str:
+        return f"id: {self.id}\nevent: {self.event}\ndata: {self.data}\n\n"
+
+
+class Subscription:
+    """Подписка на канал с ограниченной очередью"""
+
+    def __init__(self, channel: Hashable, maxsize: int):
+        self.channel = channel
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self.dropped = False
+
+    async def get(self) -> Optional[Event]:
+        """Следующее событие; None — подписчик отключён как медленный"""
+        return await self.queue.get()
+
+
+class EventHub:
+    """Внутрипроцессный pub/sub для новых постов и комментариев.
+
+    Работает в пределах одного воркера: публикации из других процессов
+    сюда не попадают, пропуски клиент догоняет через Last-Event-ID.
+    """
+
+    def __init__(self, queue_size: int = SSE_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._channels: Dict[Hashable, Set[Subscription]] = {}
+        self.published = 0
+        self.dropped = 0
+
+    def subscribe(self, channel: Hashable) -> Subscription:
+        """Подписаться на канал"""
+        subscription = Subscription(channel, self.queue_size)
+        self._channels.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """Отписаться от канала"""
+        subscribers = self._channels.get(subscription.channel)
+        if subscribers is None:
+            return
+        subscribers.discard(subscription)
+        if not subscribers:
+            del self._channels[subscription.channel]
+
+    def subscribers(self, channel: Hashable) -> int:
+        """Количество подписчиков канала"""
+        return len(self._channels.get(channel, ()))
+
+    def publish(self, channel: Hashable, event: Event) -> int:
+        """Разослать событие подписчикам канала, не блокируя издателя"""
+        subscribers = self._channels.get(channel)
+        if not subscribers:
+            return 0
+
+        self.published += 1
+        delivered = 0
+        for subscription in list(subscribers):
+            try:
+                subscription.queue.put_nowait(event)
+                delivered += 1
+            except asyncio.QueueFull:
+                self._drop(subscription)
+        return delivered
+
+    def _drop(self, subscription: Subscription) -> None:
+        # Медленный подписчик: очищаем очередь и отключаем его,
+        # после переподключения он догонит пропущенное из БД
+        self.unsubscribe(subscription)
+        subscription.dropped = True
+        self.dropped += 1
+        while not subscription.queue.empty():
+            subscription.queue.get_nowait()
+        subscription.queue.put_nowait(None)
+
+
+# Общий хаб процесса
+hub = EventHub()
+
+
+def post_channel(post_id: int) -> tuple:
+    """Канал новых комментариев к посту"""
+    return ("post", post_id)
+
+
+def topic_channel(topic_id: int) -> tuple:
+    """Канал новых постов в теме"""
+    return ("topic", topic_id)
+
+
+async def event_stream(
+        request: Request,
+        channel: Hashable,
+        replay: Callable[..., Awaitable[List[Event]]],
+        last_event_id: Optional[int] = None
+) -> AsyncIterator[str]:
+    """Поток SSE: догоняем пропущенное из БД, затем читаем из хаба"""
+    # Подписываемся до чтения из БД, чтобы не потерять события между ними
+    subscription = hub.subscribe(channel)
+    try:
+        last_id = last_event_id or 0
+        if last_event_id is not None:
+            async with AsyncSessionLocal() as db:
+                while True:
+                    events = await replay(db, last_id, SSE_REPLAY_BATCH)
+                    for event in events:
+                        last_id = event.id
+                        yield event.encode()
+                    if len(events) < SSE_REPLAY_BATCH:
+                        break
+
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.get(), SSE_KEEPALIVE)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    break
+                yield ": keepalive\n\n"
+                continue
+
+            if event is None:
+                break
+            if event.id <= last_id:
+                continue
+            last_id = event.id
+            yield event.encode()
+    finally:
+        hub.unsubscribe(subscription)
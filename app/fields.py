@@ -0,0 +1,114 @@
+from fastapi import HTTPException, Query
+from fastapi.responses import Response
+from pydantic import BaseModel, ConfigDict, TypeAdapter, create_model
+from functools import lru_cache
+from typing import List, NamedTuple, Optional, Tuple, Type
+
+
+class FieldSet(NamedTuple):
+    """Набор запрошенных полей: колонки и связи"""
+    columns: frozenset
+    relationships: frozenset
+
+
+# Только первичный ключ: для проверки существования записи
+ID_ONLY = FieldSet(frozenset({"id"}), frozenset())
+
+
+def _split(value: Optional[str]) -> List[str]:
+    if not value:
+        return []
+    return [name.strip() for name in value.split(",") if name.strip()]
+
+
+def parse_fields(
+        schema: Type[BaseModel],
+        fields: Optional[str],
+        include: Optional[str] = None,
+        relationships: Tuple[str, ...] = ()
+) -> Optional[FieldSet]:
+    """Разобрать fields/include и проверить их по схеме Pydantic"""
+    if fields is None and include is None:
+        return None
+
+    requested_columns = _split(fields)
+    requested_relationships = _split(include)
+    columns = [name for name in schema.model_fields if name not in relationships]
+
+    unknown = [name for name in requested_columns if name not in columns]
+    unknown += [name for name in requested_relationships if name not in relationships]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields: {', '.join(unknown)}"
+        )
+
+    # Без fields возвращаем все колонки, id возвращается всегда
+    selected = set(requested_columns) if fields is not None else set(columns)
+    if "id" in columns:
+        selected.add("id")
+
+    return FieldSet(frozenset(selected), frozenset(requested_relationships))
+
+
+def sparse_fields(schema: Type[BaseModel], relationships: Tuple[str, ...] = ()):
+    """Зависимость FastAPI для параметров fields/include"""
+    if relationships:
+        async def dependency(
+                fields: Optional[str] = Query(None, description="Список возвращаемых полей через запятую"),
+                include: Optional[str] = Query(None, description="Список подгружаемых связей через запятую")
+        ) -> Optional[FieldSet]:
+            return parse_fields(schema, fields, include, relationships)
+    else:
+        async def dependency(
+                fields: Optional[str] = Query(None, description="Список возвращаемых полей через запятую")
+        ) -> Optional[FieldSet]:
+            return parse_fields(schema, fields)
+
+    return dependency
+
+
+@lru_cache(maxsize=256)
+def sparse_model(schema: Type[BaseModel], names: frozenset) -> Type[BaseModel]:
+    """Схема ответа, урезанная до выбранных полей (кэшируется по набору полей)"""
+    definitions = {
+        name: (info.annotation, info)
+        for name, info in schema.model_fields.items()
+        if name in names
+    }
+    suffix = "_".join(sorted(names))
+    return create_model(
+        f"{schema.__name__}__{suffix}",
+        __config__=ConfigDict(from_attributes=True),
+        **definitions
+    )
+
+
+@lru_cache(maxsize=256)
+def _list_adapter(model: Type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(List[model])
+
+
+def sparse_dump(schema: Type[BaseModel], fieldset: FieldSet, obj) -> dict:
+    """Сериализовать объект ORM только по выбранным полям"""
+    model = sparse_model(schema, fieldset.columns | fieldset.relationships)
+    return model.model_validate(obj).model_dump(mode="json")
+
+
+def sparse_json(schema: Type[BaseModel], fieldset: FieldSet, data) -> bytes:
+    """JSON объекта ORM (или списка объектов) только с выбранными полями"""
+    model = sparse_model(schema, fieldset.columns | fieldset.relationships)
+    if isinstance(data, (list, tuple)):
+        adapter = _list_adapter(model)
+        return adapter.dump_json(adapter.validate_python(list(data), from_attributes=True))
+    return model.model_validate(data).model_dump_json().encode()
+
+
+def sparse_response(schema: Type[BaseModel], fieldset: FieldSet, data) -> Response:
+    """Ответ из объекта ORM (или списка объектов) только с выбранными полями"""
+    return json_response(sparse_json(schema, fieldset, data))
+
+
+def json_response(body: bytes) -> Response:
+    """Ответ из готового JSON: у каждого запроса свой объект и свои заголовки"""
+    return Response(content=body, media_type="application/json")
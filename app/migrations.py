@@ -0,0 +1,282 @@
+import asyncio
+import argparse
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import AsyncIterator, Callable, List, NamedTuple, Tuple
+
+from sqlalchemy import (
+    Column, DateTime, ForeignKey, Index, Integer, MetaData, String, Table, Text, func, insert, inspect, select
+)
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.database import ARCHIVE_SCHEMA, engine
+
+logger = logging.getLogger(__name__)
+
+# Проверка схемы при запуске: migrate — применить недостающие миграции,
+# verify — только сверить версию, skip — не выполнять DDL и проверок
+SCHEMA_CHECK = os.getenv("SCHEMA_CHECK", "migrate")
+# Сколько воркер ждёт блокировку записи, пока миграции применяет другой
+MIGRATION_LOCK_TIMEOUT = float(os.getenv("MIGRATION_LOCK_TIMEOUT", "300"))
+
+# Таблицы версий хранятся отдельно от метаданных моделей. Архив комментариев
+# может лежать в отдельном файле (ATTACH), поэтому у него своя цепочка миграций
+# и своя таблица версий в том же файле
+version_metadata = MetaData()
+schema_migrations = Table(
+    "schema_migrations",
+    version_metadata,
+    Column("version", Integer, primary_key=True),
+    Column("name", String(100), nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+archive_migrations = Table(
+    "archive_migrations",
+    version_metadata,
+    Column("version", Integer, primary_key=True),
+    Column("name", String(100), nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+    schema="archive",
+)
+
+# Схема на момент каждой миграции. Модели не используются: их изменения
+# оформляются новыми миграциями, а уже применённые миграции не меняются
+initial_metadata = MetaData()
+initial_topics = Table(
+    "topics",
+    initial_metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("name", String(100), unique=True, nullable=False, index=True),
+    Column("description", Text, nullable=True),
+    Column("created_at", DateTime),
+)
+initial_posts = Table(
+    "posts",
+    initial_metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("title", String(200), nullable=False, index=True),
+    Column("content", Text, nullable=False),
+    Column("created_at", DateTime),
+    Column("updated_at", DateTime),
+    Column("topic_id", Integer, ForeignKey("topics.id"), nullable=False),
+)
+initial_comments = Table(
+    "comments",
+    initial_metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("content", Text, nullable=False),
+    Column("author", String(100), nullable=False),
+    Column("created_at", DateTime),
+    Column("post_id", Integer, ForeignKey("posts.id"), nullable=False),
+    sqlite_autoincrement=True,
+)
+
+archive_metadata = MetaData()
+initial_comments_archive = Table(
+    "comments_archive",
+    archive_metadata,
+    Column("id", Integer, primary_key=True),
+    Column("content", Text, nullable=False),
+    Column("author", String(100), nullable=False),
+    Column("created_at", DateTime),
+    Column("archived_at", DateTime),
+    Column("post_id", Integer, nullable=False),
+    Index("ix_comments_archive_post_id_created_at", "post_id", "created_at"),
+    schema="archive",
+)
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    apply: Callable[[Connection], None]
+
+
+def _create_index(index: Index):
+    def apply(conn: Connection) -> None:
+        index.create(conn, checkfirst=True)
+    return apply
+
+
+def _create_tables(metadata: MetaData):
+    def apply(conn: Connection) -> None:
+        # Для баз, созданных до миграций, существующие таблицы пропускаются
+        metadata.create_all(conn)
+    return apply
+
+
+def _comments_autoincrement(conn: Connection) -> None:
+    """Пересобрать comments с AUTOINCREMENT и поднять счётчик id выше архива.
+
+    Без AUTOINCREMENT SQLite выдаёт новому комментарию max(id) + 1, и после
+    удаления самого нового горячего комментария id может совпасть с архивным.
+    """
+    if conn.dialect.name != "sqlite":
+        return
+    ddl = conn.exec_driver_sql(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'comments'"
+    ).scalar()
+    if "AUTOINCREMENT" not in ddl.upper():
+        conn.exec_driver_sql(
+            "CREATE TABLE comments_new ("
+            "id INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT, "
+            "content TEXT NOT NULL, "
+            "author VARCHAR(100) NOT NULL, "
+            "created_at DATETIME, "
+            "post_id INTEGER NOT NULL, "
+            "FOREIGN KEY(post_id) REFERENCES posts (id))"
+        )
+        conn.exec_driver_sql(
+            "INSERT INTO comments_new (id, content, author, created_at, post_id) "
+            "SELECT id, content, author, created_at, post_id FROM comments"
+        )
+        # Индексы удаляются вместе со старой таблицей
+        conn.exec_driver_sql("DROP TABLE comments")
+        conn.exec_driver_sql("ALTER TABLE comments_new RENAME TO comments")
+        for index in initial_comments.indexes:
+            index.create(conn, checkfirst=True)
+
+    top = conn.execute(select(func.coalesce(func.max(initial_comments.c.id), 0))).scalar()
+    if inspect(conn).has_table(initial_comments_archive.name, schema=ARCHIVE_SCHEMA):
+        archived = conn.execute(select(func.coalesce(func.max(initial_comments_archive.c.id), 0))).scalar()
+        top = max(top, archived)
+    conn.exec_driver_sql("DELETE FROM sqlite_sequence WHERE name = 'comments'")
+    conn.exec_driver_sql("INSERT INTO sqlite_sequence (name, seq) VALUES ('comments', ?)", (top,))
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "initial", _create_tables(initial_metadata)),
+    Migration(2, "posts_topic_id_created_at", _create_index(
+        Index("ix_posts_topic_id_created_at", initial_posts.c.topic_id, initial_posts.c.created_at))),
+    Migration(3, "comments_post_id_created_at", _create_index(
+        Index("ix_comments_post_id_created_at", initial_comments.c.post_id, initial_comments.c.created_at))),
+    Migration(4, "comments_created_at", _create_index(
+        Index("ix_comments_created_at", initial_comments.c.created_at))),
+    Migration(5, "comments_autoincrement", _comments_autoincrement),
+]
+
+ARCHIVE_MIGRATIONS: List[Migration] = [
+    Migration(1, "comments_archive", _create_tables(archive_metadata)),
+]
+
+LATEST_VERSION = MIGRATIONS[-1].version
+LATEST_ARCHIVE_VERSION = ARCHIVE_MIGRATIONS[-1].version
+
+
+def _current_version(conn: Connection, versions: Table = schema_migrations) -> int:
+    # Только чтение: таблица версий создаётся первой миграцией под блокировкой
+    schema = ARCHIVE_SCHEMA if versions.schema else None
+    if not inspect(conn).has_table(versions.name, schema=schema):
+        return 0
+    return conn.execute(select(func.max(versions.c.version))).scalar() or 0
+
+
+def _current_versions(conn: Connection) -> Tuple[int, int]:
+    return _current_version(conn), _current_version(conn, archive_migrations)
+
+
+async def current_version() -> int:
+    """Текущая версия схемы базы данных"""
+    async with engine.connect() as conn:
+        return await conn.run_sync(_current_version)
+
+
+@asynccontextmanager
+async def _migration_transaction() -> AsyncIterator[AsyncConnection]:
+    """Транзакция миграции под блокировкой записи.
+
+    pysqlite не открывает транзакцию для SELECT и DDL, поэтому без явного
+    BEGIN IMMEDIATE несколько воркеров проверили бы версию одновременно
+    и применили одну и ту же миграцию.
+    """
+    async with engine.connect() as conn:
+        if conn.dialect.name == "sqlite":
+            deadline = time.monotonic() + MIGRATION_LOCK_TIMEOUT
+            while True:
+                try:
+                    await conn.exec_driver_sql("BEGIN IMMEDIATE")
+                    break
+                except OperationalError as e:
+                    if "locked" not in str(e) or time.monotonic() > deadline:
+                        raise
+                    await conn.rollback()
+                    await asyncio.sleep(0.1)
+        yield conn
+        await conn.commit()
+
+
+async def _apply(migrations: List[Migration], versions: Table, target: int) -> List[int]:
+    applied = []
+    for migration in migrations:
+        if migration.version > target:
+            break
+        async with _migration_transaction() as conn:
+            # Версию перечитываем под блокировкой: другой воркер мог успеть раньше
+            if await conn.run_sync(_current_version, versions) >= migration.version:
+                continue
+            logger.info("Applying migration %s %d %s", versions.name, migration.version, migration.name)
+            await conn.run_sync(versions.create, checkfirst=True)
+            await conn.run_sync(migration.apply)
+            await conn.execute(insert(versions).values(
+                version=migration.version,
+                name=migration.name,
+                applied_at=datetime.utcnow()
+            ))
+        applied.append(migration.version)
+    return applied
+
+
+async def migrate(target: int = LATEST_VERSION) -> List[int]:
+    """Применить недостающие миграции, каждую в своей транзакции"""
+    # Схема актуальна: одна проверка вместо транзакции на каждую миграцию
+    async with engine.connect() as conn:
+        version, archive_version = await conn.run_sync(_current_versions)
+    applied = []
+    if version < target:
+        applied = await _apply(MIGRATIONS, schema_migrations, target)
+    # Файл архива мог быть подключён позже основной базы
+    if archive_version < LATEST_ARCHIVE_VERSION:
+        await _apply(ARCHIVE_MIGRATIONS, archive_migrations, LATEST_ARCHIVE_VERSION)
+    return applied
+
+
+async def check_schema(mode: str = SCHEMA_CHECK) -> None:
+    """Проверка схемы при запуске воркера"""
+    if mode == "skip":
+        return
+    if mode == "verify":
+        async with engine.connect() as conn:
+            version, archive_version = await conn.run_sync(_current_versions)
+        if version < LATEST_VERSION or archive_version < LATEST_ARCHIVE_VERSION:
+            raise RuntimeError(
+                f"Database schema is behind: version {version} of {LATEST_VERSION}, "
+                f"archive {archive_version} of {LATEST_ARCHIVE_VERSION}, run: python -m app.migrations"
+            )
+        return
+    await migrate()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Миграции схемы базы данных")
+    parser.add_argument("--status", action="store_true", help="Показать версию схемы")
+    parser.add_argument("--target", type=int, default=LATEST_VERSION)
+    args = parser.parse_args()
+
+    engine.echo = False
+    if args.status:
+        async with engine.connect() as conn:
+            version, archive_version = await conn.run_sync(_current_versions)
+        print(f"Версия схемы: {version} из {LATEST_VERSION}, архив: {archive_version} из {LATEST_ARCHIVE_VERSION}")
+    else:
+        applied = await migrate(args.target)
+        print(f"Применено миграций: {len(applied)}, версия схемы: {await current_version()}")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
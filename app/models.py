@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -20,6 +20,10 @@ class Topic(Base):
 
 class Post(Base):
     __tablename__ = "posts"
+    # Список постов темы, новые первыми
+    __table_args__ = (
+        Index("ix_posts_topic_id_created_at", "topic_id", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(200), nullable=False, index=True)
@@ -37,6 +41,14 @@ class Post(Base):
 
 class Comment(Base):
     __tablename__ = "comments"
+    __table_args__ = (
+        # Комментарии поста по дате создания
+        Index("ix_comments_post_id_created_at", "post_id", "created_at"),
+        # Поиск кандидатов на архивацию
+        Index("ix_comments_created_at", "created_at"),
+        # Без AUTOINCREMENT SQLite переиспользует id, ушедшие в архив
+        {"sqlite_autoincrement": True},
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     content = Column(Text, nullable=False)
@@ -47,4 +59,24 @@ class Comment(Base):
     post_id = Column(Integer, ForeignKey("posts.id"), nullable=False)
 
     # Связь с постом
-    post = relationship("Post", back_populates="comments")
\ No newline at end of file
+    post = relationship("Post", back_populates="comments")
+
+
+class CommentArchive(Base):
+    """Архив старых комментариев (холодный уровень хранения)"""
+    __tablename__ = "comments_archive"
+    # Схема "archive" подменяется через schema_translate_map:
+    # отдельный файл SQLite через ATTACH или та же база
+    __table_args__ = (
+        Index("ix_comments_archive_post_id_created_at", "post_id", "created_at"),
+        {"schema": "archive"},
+    )
+
+    id = Column(Integer, primary_key=True)
+    content = Column(Text, nullable=False)
+    author = Column(String(100), nullable=False)
+    created_at = Column(DateTime)
+    archived_at = Column(DateTime, default=datetime.utcnow)
+
+    # Без внешнего ключа: архив может лежать в другом файле
+    post_id = Column(Integer, nullable=False)
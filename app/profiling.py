@@ -0,0 +1,233 @@
+import asyncio
+import itertools
+import os
+import random
+import secrets
+import sys
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+from typing import Dict, List, Optional
+
+# Настройки профилирования (без токена и с нулевой долей — выключено)
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_THRESHOLD_MS = float(os.getenv("PROFILE_THRESHOLD_MS", "500"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_BUFFER_SIZE = int(os.getenv("PROFILE_BUFFER_SIZE", "50"))
+
+PROFILE_HEADER = b"x-profile"
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+
+def _await_chain(coro) -> tuple:
+    """Кадры корутины по цепочке await и объект, которого она ждёт"""
+    frames = []
+    while coro is not None:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None)
+        if frame is None:
+            break
+        frames.append(frame)
+        next_coro = getattr(coro, "cr_await", None)
+        if next_coro is None:
+            next_coro = getattr(coro, "gi_yieldfrom", None)
+        coro = next_coro
+    return frames, coro
+
+
+class Profile:
+    """Профиль одного запроса в формате свёрнутых стеков"""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, method: str, path: str, trigger: str):
+        self.id = next(self._ids)
+        self.method = method
+        self.path = path
+        self.trigger = trigger
+        self.started_at = datetime.utcnow()
+        self.duration_ms = 0.0
+        self.samples: Counter = Counter()
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "trigger": self.trigger,
+            "started_at": self.started_at.isoformat(),
+            "duration_ms": round(self.duration_ms, 2),
+            "samples": sum(self.samples.values()),
+        }
+
+    def collapsed(self) -> str:
+        """Свёрнутые стеки для flamegraph.pl / speedscope"""
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+
+class Sampler:
+    """Фоновый поток, снимающий стеки задач запросов с заданным интервалом.
+
+    Если задача выполняется, берётся стек потока цикла событий от её корутины;
+    если ждёт, берётся цепочка await до ожидаемого объекта (например, Future
+    потока aiosqlite). Если запрос ждёт порождённую им задачу (follow), стек
+    продолжается стеком этой задачи.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._active: Dict[asyncio.Task, Profile] = {}
+        self._children: Dict[asyncio.Task, asyncio.Task] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._loop_thread_id: Optional[int] = None
+
+    def start(self, task: asyncio.Task, profile: Profile) -> None:
+        with self._lock:
+            self._loop_thread_id = threading.get_ident()
+            self._active[task] = profile
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+                self._thread.start()
+
+    def stop(self, task: asyncio.Task) -> None:
+        with self._lock:
+            self._active.pop(task, None)
+            self._children.pop(task, None)
+
+    def follow(self, parent: asyncio.Task, child: asyncio.Task) -> None:
+        """Снимать стек задачи child как продолжение стека профилируемой parent"""
+        if parent not in self._active:
+            return
+        with self._lock:
+            self._children[parent] = child
+        child.add_done_callback(lambda done: self._unfollow(parent, done))
+
+    def _unfollow(self, parent: asyncio.Task, child: asyncio.Task) -> None:
+        with self._lock:
+            if self._children.get(parent) is child:
+                del self._children[parent]
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._active:
+                    self._thread = None
+                    return
+                active = list(self._active.items())
+                children = dict(self._children)
+            thread_frame = sys._current_frames().get(self._loop_thread_id)
+            for task, profile in active:
+                stack = self._sample(task, thread_frame, children.get(task))
+                if stack:
+                    profile.samples[stack] += 1
+
+    @classmethod
+    def _sample(cls, task: asyncio.Task, thread_frame, child: Optional[asyncio.Task] = None) -> Optional[str]:
+        frames, awaited = _await_chain(task.get_coro())
+        if not frames:
+            return None
+
+        # Задача выполняется сейчас: её корневой кадр есть в стеке потока
+        running: List = []
+        frame = thread_frame
+        while frame is not None:
+            running.append(frame)
+            if frame is frames[0]:
+                labels = [_frame_label(f) for f in reversed(running)]
+                return ";".join(labels)
+            frame = frame.f_back
+
+        labels = [_frame_label(f) for f in frames]
+        if child is not None and not child.done():
+            child_stack = cls._sample(child, thread_frame)
+            if child_stack:
+                labels.append(child_stack)
+                return ";".join(labels)
+        labels.append(f"[await {type(awaited).__name__}]")
+        return ";".join(labels)
+
+
+class ProfileStore:
+    """Последние N профилей"""
+
+    def __init__(self, size: int = PROFILE_BUFFER_SIZE):
+        self._profiles: deque = deque(maxlen=size)
+
+    def add(self, profile: Profile) -> None:
+        self._profiles.append(profile)
+
+    def list(self) -> List[Profile]:
+        return list(reversed(self._profiles))
+
+    def get(self, profile_id: int) -> Optional[Profile]:
+        for profile in self._profiles:
+            if profile.id == profile_id:
+                return profile
+        return None
+
+
+profiles = ProfileStore()
+sampler = Sampler(PROFILE_INTERVAL_MS / 1000)
+
+
+def follow_task(task: asyncio.Task) -> None:
+    """Учитывать в профиле текущего запроса задачу, которую он запустил и ждёт"""
+    parent = asyncio.current_task()
+    if parent is not None:
+        sampler.follow(parent, task)
+
+
+class ProfilingMiddleware:
+    """Профилирование запросов по заголовку X-Profile или выборочно по порогу задержки"""
+
+    def __init__(
+            self,
+            app,
+            token: Optional[str] = PROFILE_TOKEN,
+            sample_rate: float = PROFILE_SAMPLE_RATE,
+            threshold_ms: float = PROFILE_THRESHOLD_MS
+    ):
+        self.app = app
+        self.token = token.encode() if token else None
+        self.sample_rate = sample_rate
+        self.threshold_ms = threshold_ms
+        self.enabled = self.token is not None or sample_rate > 0
+
+    def _has_token(self, headers) -> bool:
+        """Заголовок X-Profile с верным токеном (сравнение за постоянное время)"""
+        if self.token is None:
+            return False
+        value = next((value for name, value in headers if name == PROFILE_HEADER), None)
+        return value is not None and secrets.compare_digest(value, self.token)
+
+    async def __call__(self, scope, receive, send):
+        if not self.enabled or scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        trigger = None
+        if self._has_token(scope["headers"]):
+            trigger = "header"
+        elif self.sample_rate > 0 and random.random() < self.sample_rate:
+            trigger = "threshold"
+        if trigger is None:
+            return await self.app(scope, receive, send)
+
+        profile = Profile(scope["method"], scope["path"], trigger)
+        task = asyncio.current_task()
+        sampler.start(task, profile)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            sampler.stop(task)
+            profile.duration_ms = (time.perf_counter() - start) * 1000
+            # Выборочные профили сохраняются только для медленных запросов
+            if trigger == "header" or profile.duration_ms >= self.threshold_ms:
+                profiles.add(profile)
@@ -0,0 +1,183 @@
+"""
+Заранее построенные запросы для CRUD.
+
+Конструкции select(...) создаются один раз при импорте, значения передаются
+через bindparam. Ключ кэша компиляции SQLAlchemy у таких запросов не меняется,
+а одинаковый текст SQL переиспользует подготовленные выражения драйвера.
+"""
+
+from sqlalchemy import DateTime, bindparam, delete, desc, func, insert, select
+from sqlalchemy.orm import load_only, noload, selectinload
+from functools import lru_cache
+
+from app.fields import FieldSet
+from app.models import Comment, CommentArchive, Post, Topic
+
+# Связи моделей и внешние ключи, необходимые для их загрузки
+TOPIC_RELATIONSHIPS = (("posts", None),)
+POST_RELATIONSHIPS = (("topic", "topic_id"), ("comments", None))
+COMMENT_RELATIONSHIPS = (("post", "post_id"),)
+COMMENT_ARCHIVE_RELATIONSHIPS = ()
+
+
+# Темы
+TOPIC_BY_ID = select(Topic).where(Topic.id == bindparam("topic_id"))
+
+TOPIC_BY_NAME = select(Topic).where(Topic.name == bindparam("name"))
+
+TOPICS = (
+    select(Topic)
+    .order_by(Topic.name)
+    .offset(bindparam("skip"))
+    .limit(bindparam("limit"))
+)
+
+
+# Посты
+POST_BY_ID = (
+    select(Post)
+    .options(selectinload(Post.topic), selectinload(Post.comments))
+    .where(Post.id == bindparam("post_id"))
+)
+
+# Без опций загрузки: для разреженных ответов опции добавляет with_fields
+POST_BY_ID_BARE = select(Post).where(Post.id == bindparam("post_id"))
+
+_POSTS_PAGE = (
+    select(Post)
+    .order_by(desc(Post.created_at))
+    .offset(bindparam("skip"))
+    .limit(bindparam("limit"))
+)
+
+POSTS_BARE = _POSTS_PAGE
+
+POSTS_BY_TOPIC_BARE = _POSTS_PAGE.where(Post.topic_id == bindparam("topic_id"))
+
+POSTS = POSTS_BARE.options(selectinload(Post.topic))
+
+POSTS_BY_TOPIC = POSTS_BY_TOPIC_BARE.options(selectinload(Post.topic))
+
+POSTS_COUNT = select(func.count(Post.id))
+
+POSTS_BY_TOPIC_COUNT = POSTS_COUNT.where(Post.topic_id == bindparam("topic_id"))
+
+POST_EVENTS = (
+    select(Post)
+    .options(load_only(Post.id, Post.title, Post.created_at, Post.topic_id))
+    .where(Post.topic_id == bindparam("topic_id"), Post.id > bindparam("after_id"))
+    .order_by(Post.id)
+    .limit(bindparam("limit"))
+)
+
+
+# Комментарии
+COMMENT_BY_ID = select(Comment).where(Comment.id == bindparam("comment_id"))
+
+COMMENTS_BY_POST = (
+    select(Comment)
+    .where(Comment.post_id == bindparam("post_id"))
+    .order_by(Comment.created_at)
+    .offset(bindparam("skip"))
+    .limit(bindparam("limit"))
+)
+
+COMMENT_EVENTS = (
+    select(Comment)
+    .where(Comment.post_id == bindparam("post_id"), Comment.id > bindparam("after_id"))
+    .order_by(Comment.id)
+    .limit(bindparam("limit"))
+)
+
+
+# Архив комментариев
+ARCHIVED_COMMENT_BY_ID = select(CommentArchive).where(CommentArchive.id == bindparam("comment_id"))
+
+ARCHIVED_COMMENTS_BY_POST = (
+    select(CommentArchive)
+    .where(CommentArchive.post_id == bindparam("post_id"))
+    .order_by(CommentArchive.created_at)
+    .offset(bindparam("skip"))
+    .limit(bindparam("limit"))
+)
+
+ALL_ARCHIVED_COMMENTS_BY_POST = (
+    select(CommentArchive)
+    .where(CommentArchive.post_id == bindparam("post_id"))
+    .order_by(CommentArchive.created_at)
+)
+
+# Есть ли в архиве хоть одна строка
+ARCHIVE_HAS_ROWS = select(CommentArchive.id).limit(1)
+
+ARCHIVED_COMMENTS_COUNT = (
+    select(func.count(CommentArchive.id))
+    .where(CommentArchive.post_id == bindparam("post_id"))
+)
+
+DELETE_ARCHIVED_BY_POST = (
+    delete(CommentArchive)
+    .where(CommentArchive.post_id == bindparam("post_id"))
+    .execution_options(synchronize_session=False)
+)
+
+DELETE_ARCHIVED_BY_TOPIC = (
+    delete(CommentArchive)
+    .where(CommentArchive.post_id.in_(
+        select(Post.id).where(Post.topic_id == bindparam("topic_id")).scalar_subquery()
+    ))
+    .execution_options(synchronize_session=False)
+)
+
+# Самый новый комментарий не архивируется: в таблицах без AUTOINCREMENT
+# он не даёт SQLite выдать новым записям id из архива
+ARCHIVE_CANDIDATES = (
+    select(Comment.id)
+    .where(
+        Comment.created_at < bindparam("cutoff"),
+        Comment.id < select(func.max(Comment.id)).scalar_subquery()
+    )
+    .order_by(Comment.id)
+    .limit(bindparam("limit"))
+)
+
+# Core-вставка: ORM-insert со словарём параметров ушёл бы в bulk insert
+COPY_TO_ARCHIVE = insert(CommentArchive.__table__).from_select(
+    ["id", "content", "author", "created_at", "post_id", "archived_at"],
+    select(
+        Comment.id,
+        Comment.content,
+        Comment.author,
+        Comment.created_at,
+        Comment.post_id,
+        bindparam("archived_at", type_=DateTime)
+    ).where(Comment.id.in_(bindparam("ids", expanding=True)))
+)
+
+DELETE_HOT_COMMENTS = (
+    delete(Comment)
+    .where(Comment.id.in_(bindparam("ids", expanding=True)))
+    .execution_options(synchronize_session=False)
+)
+
+
+def _sparse_options(model, fields: FieldSet, relationships: tuple) -> list:
+    """Опции загрузки: только запрошенные колонки и связи"""
+    columns = set(fields.columns)
+    options = []
+    for name, foreign_key in relationships:
+        if name in fields.relationships:
+            # Для many-to-one нужен внешний ключ, иначе связь не подгрузится
+            if foreign_key:
+                columns.add(foreign_key)
+            options.append(selectinload(getattr(model, name)))
+        else:
+            options.append(noload(getattr(model, name)))
+    options.insert(0, load_only(*(getattr(model, name) for name in sorted(columns))))
+    return options
+
+
+@lru_cache(maxsize=512)
+def with_fields(statement, model, fields: FieldSet, relationships: tuple):
+    """Запрос с опциями разреженной загрузки (кэшируется по набору полей)"""
+    return statement.options(*_sparse_options(model, fields, relationships))
@@ -0,0 +1,41 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from typing import Optional
+import secrets
+
+from app.backup import BACKUP_TOKEN, create_backup, store, verify_backup
+
+router = APIRouter()
+
+
+async def require_backup_token(x_backup_token: Optional[str] = Header(None)):
+    """Доступ к резервным копиям только с токеном из BACKUP_TOKEN"""
+    if BACKUP_TOKEN is None:
+        raise HTTPException(status_code=404, detail="Backups endpoint is disabled")
+    if x_backup_token is None or not secrets.compare_digest(x_backup_token, BACKUP_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid backup token")
+
+
+@router.post("/backups", status_code=201, dependencies=[Depends(require_backup_token)])
+async def create_snapshot(
+        incremental: bool = Query(True, description="Сохранить только изменённые страницы")
+):
+    """Снять онлайн-снимок базы данных"""
+    try:
+        return await create_backup(incremental)
+    except RuntimeError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/backups", dependencies=[Depends(require_backup_token)])
+async def get_snapshots():
+    """Получить список снимков"""
+    return store.snapshots()
+
+
+@router.post("/backups/{snapshot_id}/verify", dependencies=[Depends(require_backup_token)])
+async def verify_snapshot(snapshot_id: int):
+    """Восстановить снимок во временный файл и проверить целостность"""
+    try:
+        return await verify_backup(snapshot_id)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Snapshot not found")
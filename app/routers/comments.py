@@ -1,9 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
+from typing import List, Optional
 
 from app.database import get_db
 from app.crud import CommentCRUD, PostCRUD
+from app.fields import FieldSet, ID_ONLY, sparse_fields, sparse_response
 from app.schemas import Comment, CommentCreate, CommentUpdate, MessageResponse
 
 router = APIRouter()
@@ -17,7 +18,7 @@ async def create_comment(
 ):
     """Создать комментарий к посту"""
     # Проверяем существование поста
-    post = await PostCRUD.get_post(db, post_id)
+    post = await PostCRUD.get_post(db, post_id, ID_ONLY)
     if not post:
         raise HTTPException(status_code=404, detail="Post not found")
 
@@ -29,26 +30,33 @@ async def get_comments_by_post(
         post_id: int,
         skip: int = Query(0, ge=0, description="Количество пропускаемых элементов"),
         limit: int = Query(100, ge=1, le=100, description="Максимальное количество элементов"),
+        fields: Optional[FieldSet] = Depends(sparse_fields(Comment)),
         db: AsyncSession = Depends(get_db)
 ):
     """Получить комментарии к посту"""
     # Проверяем существование поста
-    post = await PostCRUD.get_post(db, post_id)
+    post = await PostCRUD.get_post(db, post_id, ID_ONLY)
     if not post:
         raise HTTPException(status_code=404, detail="Post not found")
 
-    return await CommentCRUD.get_comments_by_post(db, post_id, skip, limit)
+    comments = await CommentCRUD.get_comments_by_post(db, post_id, skip, limit, fields)
+    if fields is not None:
+        return sparse_response(Comment, fields, comments)
+    return comments
 
 
 @router.get("/comments/{comment_id}", response_model=Comment)
 async def get_comment(
         comment_id: int,
+        fields: Optional[FieldSet] = Depends(sparse_fields(Comment)),
         db: AsyncSession = Depends(get_db)
 ):
     """Получить комментарий по ID"""
-    comment = await CommentCRUD.get_comment(db, comment_id)
+    comment = await CommentCRUD.get_comment(db, comment_id, fields)
     if not comment:
         raise HTTPException(status_code=404, detail="Comment not found")
+    if fields is not None:
+        return sparse_response(Comment, fields, comment)
     return comment
 
 
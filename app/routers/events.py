@@ -0,0 +1,64 @@
+from fastapi import APIRouter, Header, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from functools import partial
+from typing import Optional
+
+from app.database import AsyncSessionLocal
+from app.crud import CommentCRUD, PostCRUD, TopicCRUD
+from app.events import event_stream, post_channel, topic_channel
+from app.fields import ID_ONLY
+
+router = APIRouter()
+
+# Заголовки, отключающие буферизацию потока на прокси
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+@router.get("/posts/{post_id}/comments/stream")
+async def stream_comments(
+        post_id: int,
+        request: Request,
+        last_event_id: Optional[int] = Header(None, alias="Last-Event-ID")
+):
+    """Поток новых комментариев к посту (Server-Sent Events)"""
+    # Короткая сессия: соединение не должно удерживаться всё время жизни потока
+    async with AsyncSessionLocal() as db:
+        post = await PostCRUD.get_post(db, post_id, ID_ONLY)
+    if not post:
+        raise HTTPException(status_code=404, detail="Post not found")
+
+    replay = partial(_replay_comments, post_id)
+    return StreamingResponse(
+        event_stream(request, post_channel(post_id), replay, last_event_id),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
+
+
+@router.get("/topics/{topic_id}/posts/stream")
+async def stream_posts(
+        topic_id: int,
+        request: Request,
+        last_event_id: Optional[int] = Header(None, alias="Last-Event-ID")
+):
+    """Поток новых постов в теме (Server-Sent Events)"""
+    async with AsyncSessionLocal() as db:
+        topic = await TopicCRUD.get_topic(db, topic_id, ID_ONLY)
+    if not topic:
+        raise HTTPException(status_code=404, detail="Topic not found")
+
+    replay = partial(_replay_posts, topic_id)
+    return StreamingResponse(
+        event_stream(request, topic_channel(topic_id), replay, last_event_id),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
+
+
+async def _replay_comments(post_id: int, db: AsyncSession, after_id: int, limit: int):
+    return await CommentCRUD.get_comment_events(db, post_id, after_id, limit)
+
+
+async def _replay_posts(topic_id: int, db: AsyncSession, after_id: int, limit: int):
+    return await PostCRUD.get_post_events(db, topic_id, after_id, limit)
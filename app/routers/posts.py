@@ -1,10 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.ext.asyncio import AsyncSession
+from functools import partial
 from typing import Optional
+import json
 import math
 
-from app.database import get_db
+from app.database import AsyncSessionLocal, get_db
+from app.coalesce import coalescer, request_key
 from app.crud import PostCRUD, TopicCRUD
+from app.fields import FieldSet, ID_ONLY, json_response, sparse_fields, sparse_dump, sparse_json
 from app.schemas import Post, PostCreate, PostUpdate, PostList, PostSummary, MessageResponse
 
 router = APIRouter()
@@ -17,7 +21,7 @@ async def create_post(
 ):
     """Создать новый пост"""
     # Проверяем существование темы
-    topic = await TopicCRUD.get_topic(db, post.topic_id)
+    topic = await TopicCRUD.get_topic(db, post.topic_id, ID_ONLY)
     if not topic:
         raise HTTPException(
             status_code=404,
@@ -29,55 +33,100 @@ async def create_post(
 
 @router.get("/posts", response_model=PostList)
 async def get_posts(
+        request: Request,
         page: int = Query(1, ge=1, description="Номер страницы"),
         size: int = Query(10, ge=1, le=100, description="Количество элементов на странице"),
         topic_id: Optional[int] = Query(None, ge=1, description="Фильтр по теме"),
-        db: AsyncSession = Depends(get_db)
+        fields: Optional[FieldSet] = Depends(sparse_fields(PostSummary))
 ):
     """Получить список постов с пагинацией"""
-    skip = (page - 1) * size
-
-    # Если указан topic_id, проверяем его существование
-    if topic_id:
-        topic = await TopicCRUD.get_topic(db, topic_id)
-        if not topic:
-            raise HTTPException(
-                status_code=404,
-                detail=f"Topic with id {topic_id} not found"
-            )
-
-    posts, total = await PostCRUD.get_posts(db, skip=skip, limit=size, topic_id=topic_id)
-
-    # Преобразуем в PostSummary для списка
-    post_summaries = [
-        PostSummary(
-            id=post.id,
-            title=post.title,
-            created_at=post.created_at,
-            topic_id=post.topic_id
-        ) for post in posts
-    ]
-
-    pages = math.ceil(total / size) if total > 0 else 1
-
-    return PostList(
-        items=post_summaries,
-        total=total,
-        page=page,
-        size=size,
-        pages=pages
+    # Одинаковые одновременные запросы обращаются к БД один раз
+    result = await coalescer.do(
+        ("posts", page, size, topic_id, fields),
+        partial(_get_posts, page, size, topic_id, fields),
+        request_key(request.scope)
     )
+    # Результат общий для всех ожидающих, объект ответа у каждого свой
+    if fields is not None:
+        return json_response(result)
+    return result
+
+
+async def _get_posts(page: int, size: int, topic_id: Optional[int], fields: Optional[FieldSet]):
+    # Собственная сессия: результат разделяется между несколькими запросами,
+    # поэтому возвращаются данные, а не объект Response
+    async with AsyncSessionLocal() as db:
+        skip = (page - 1) * size
+
+        # Если указан topic_id, проверяем его существование
+        if topic_id:
+            topic = await TopicCRUD.get_topic(db, topic_id, ID_ONLY)
+            if not topic:
+                raise HTTPException(
+                    status_code=404,
+                    detail=f"Topic with id {topic_id} not found"
+                )
+
+        posts, total = await PostCRUD.get_posts(
+            db, skip=skip, limit=size, topic_id=topic_id, fields=fields
+        )
+
+        pages = math.ceil(total / size) if total > 0 else 1
+
+        # Разреженный ответ: только запрошенные поля элементов
+        if fields is not None:
+            return json.dumps({
+                "items": [sparse_dump(PostSummary, fields, post) for post in posts],
+                "total": total,
+                "page": page,
+                "size": size,
+                "pages": pages
+            }, ensure_ascii=False, separators=(",", ":")).encode()
+
+        # Преобразуем в PostSummary для списка
+        post_summaries = [
+            PostSummary(
+                id=post.id,
+                title=post.title,
+                created_at=post.created_at,
+                topic_id=post.topic_id
+            ) for post in posts
+        ]
+
+        return PostList(
+            items=post_summaries,
+            total=total,
+            page=page,
+            size=size,
+            pages=pages
+        )
 
 
 @router.get("/posts/{post_id}", response_model=Post)
 async def get_post(
         post_id: int,
-        db: AsyncSession = Depends(get_db)
+        request: Request,
+        fields: Optional[FieldSet] = Depends(sparse_fields(Post, relationships=("topic", "comments")))
 ):
     """Получить пост по ID"""
-    post = await PostCRUD.get_post(db, post_id)
+    # Одинаковые одновременные запросы обращаются к БД один раз
+    result = await coalescer.do(
+        ("post", post_id, fields),
+        partial(_get_post, post_id, fields),
+        request_key(request.scope)
+    )
+    if fields is not None:
+        return json_response(result)
+    return result
+
+
+async def _get_post(post_id: int, fields: Optional[FieldSet]):
+    async with AsyncSessionLocal() as db:
+        post = await PostCRUD.get_post(db, post_id, fields)
     if not post:
         raise HTTPException(status_code=404, detail="Post not found")
+    if fields is not None:
+        return sparse_json(Post, fields, post)
     return post
 
 
@@ -90,7 +139,7 @@ async def update_post(
     """Обновить пост"""
     # Если обновляется topic_id, проверяем его существование
     if post_update.topic_id:
-        topic = await TopicCRUD.get_topic(db, post_update.topic_id)
+        topic = await TopicCRUD.get_topic(db, post_update.topic_id, ID_ONLY)
         if not topic:
             raise HTTPException(
                 status_code=404,
@@ -0,0 +1,34 @@
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import PlainTextResponse
+from typing import Optional
+import secrets
+
+from app.profiling import PROFILE_TOKEN, profiles
+
+router = APIRouter()
+
+
+async def require_profile_token(x_profile: Optional[str] = Header(None)):
+    """Доступ к профилям только с токеном из PROFILE_TOKEN"""
+    if PROFILE_TOKEN is None:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+    if x_profile is None or not secrets.compare_digest(x_profile, PROFILE_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid profile token")
+
+
+@router.get("/profiles", dependencies=[Depends(require_profile_token)])
+async def get_profiles():
+    """Получить список сохранённых профилей"""
+    return [profile.summary() for profile in profiles.list()]
+
+
+@router.get("/profiles/{profile_id}", dependencies=[Depends(require_profile_token)])
+async def get_profile(profile_id: int):
+    """Скачать профиль в формате свёрнутых стеков (flamegraph.pl, speedscope)"""
+    profile = profiles.get(profile_id)
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return PlainTextResponse(
+        profile.collapsed(),
+        headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.folded"'}
+    )
@@ -1,9 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
+from typing import List, Optional
 
 from app.database import get_db
 from app.crud import TopicCRUD
+from app.fields import FieldSet, sparse_fields, sparse_response
 from app.schemas import Topic, TopicCreate, TopicUpdate, MessageResponse
 
 router = APIRouter()
@@ -30,21 +31,28 @@ async def create_topic(
 async def get_topics(
         skip: int = Query(0, ge=0, description="Количество пропускаемых элементов"),
         limit: int = Query(100, ge=1, le=100, description="Максимальное количество элементов"),
+        fields: Optional[FieldSet] = Depends(sparse_fields(Topic)),
         db: AsyncSession = Depends(get_db)
 ):
     """Получить список тем"""
-    return await TopicCRUD.get_topics(db, skip, limit)
+    topics = await TopicCRUD.get_topics(db, skip, limit, fields)
+    if fields is not None:
+        return sparse_response(Topic, fields, topics)
+    return topics
 
 
 @router.get("/topics/{topic_id}", response_model=Topic)
 async def get_topic(
         topic_id: int,
+        fields: Optional[FieldSet] = Depends(sparse_fields(Topic)),
         db: AsyncSession = Depends(get_db)
 ):
     """Получить тему по ID"""
-    topic = await TopicCRUD.get_topic(db, topic_id)
+    topic = await TopicCRUD.get_topic(db, topic_id, fields)
     if not topic:
         raise HTTPException(status_code=404, detail="Topic not found")
+    if fields is not None:
+        return sparse_response(Topic, fields, topic)
     return topic
 
 
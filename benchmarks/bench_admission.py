@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Нагрузочный тест допуска запросов
+Сотни одновременных клиентов с лимитами и без: p99 успешных ответов,
+доля отклонённых (503) и пропускная способность при насыщении; отдельно —
+всплеск чтений одного поста, где присоединившиеся к объединённому запросу
+клиенты проходят без слота
+Требует httpx
+"""
+
+import asyncio
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+TMP_DIR = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{TMP_DIR}/bench.db"
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import httpx
+
+from app.admission import controller
+from app.coalesce import coalescer
+from app.database import engine
+from app.migrations import migrate
+from main import app
+
+
+async def seed(client: httpx.AsyncClient, posts: int) -> None:
+    topic = (await client.post("/api/topics", json={"name": "bench"})).json()
+    for i in range(posts):
+        await client.post("/api/posts", json={
+            "title": f"post {i}", "content": "x" * 2000, "topic_id": topic["id"]
+        })
+
+
+async def flood(client: httpx.AsyncClient, clients: int, seconds: float, posts: int, hot: bool = False) -> dict:
+    ok, shed = [], 0
+    health = []
+    deadline = time.perf_counter() + seconds
+
+    async def worker():
+        nonlocal shed
+        while time.perf_counter() < deadline:
+            post_id = 1 if hot else random.randint(1, posts)
+            start = time.perf_counter()
+            if not hot and random.random() < 0.1:
+                response = await client.post(f"/api/posts/{post_id}/comments",
+                                             json={"content": "load", "author": "bench"})
+            else:
+                response = await client.get(f"/api/posts/{post_id}")
+            if response.status_code == 503:
+                shed += 1
+                await asyncio.sleep(0.05)
+            else:
+                ok.append(time.perf_counter() - start)
+
+    async def probe():
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            await client.get("/health")
+            health.append(time.perf_counter() - start)
+            await asyncio.sleep(0.1)
+
+    await asyncio.gather(probe(), *(worker() for _ in range(clients)))
+    ok.sort()
+    health.sort()
+    return {
+        "ok": len(ok),
+        "shed": shed,
+        "rps": len(ok) / seconds,
+        "p50": ok[len(ok) // 2] * 1000,
+        "p99": ok[int(len(ok) * 0.99)] * 1000,
+        "health_p99": health[int(len(health) * 0.99)] * 1000,
+    }
+
+
+def report(label: str, result: dict) -> None:
+    print(f"{label:<12} успешно: {result['ok']:>6} ({result['rps']:.0f}/с)  отклонено: {result['shed']:>6}  "
+          f"p50 {result['p50']:7.1f} мс  p99 {result['p99']:7.1f} мс  /health p99 {result['health_p99']:6.1f} мс")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clients", type=int, default=300)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--posts", type=int, default=500)
+    args = parser.parse_args()
+
+    engine.echo = False
+    coalescer.enabled = False
+    await migrate()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        await seed(client, args.posts)
+        for enabled in (False, True):
+            controller.enabled = enabled
+            result = await flood(client, args.clients, args.seconds, args.posts)
+            label = "с лимитами" if enabled else "без лимитов"
+            report(label, result)
+
+        # Всплеск чтений одного поста с объединением запросов
+        coalescer.enabled = True
+        before = controller.coalesced
+        result = await flood(client, args.clients, args.seconds, args.posts, hot=True)
+        report("один пост", result)
+        print(f"  без слота (присоединились к выполняющемуся чтению): {controller.coalesced - before}")
+    print(f"метрики: {controller.stats()}")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
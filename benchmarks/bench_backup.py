@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк онлайн-резервного копирования
+Скорость полного и инкрементального снимка и влияние на p99 запросов
+под нагрузкой чтения и записи
+Требует httpx
+"""
+
+import asyncio
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+TMP_DIR = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{TMP_DIR}/bench.db"
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import httpx
+
+from app.backup import BackupStore, create_backup
+from app.database import engine
+from app.migrations import migrate
+from main import app
+
+
+async def seed(client: httpx.AsyncClient, posts: int) -> None:
+    topic = (await client.post("/api/topics", json={"name": "bench"})).json()
+    for i in range(posts):
+        await client.post("/api/posts", json={
+            "title": f"post {i}", "content": "x" * 4000, "topic_id": topic["id"]
+        })
+
+
+async def load(client: httpx.AsyncClient, stop: asyncio.Event, posts: int) -> list:
+    latencies = []
+
+    async def worker(n: int):
+        i = n
+        while not stop.is_set():
+            start = time.perf_counter()
+            if i % 10 == 0:
+                await client.post(f"/api/posts/{i % posts + 1}/comments",
+                                  json={"content": "load", "author": "bench"})
+            elif i % 2:
+                await client.get(f"/api/posts/{i % posts + 1}")
+            else:
+                await client.get("/api/posts?page=1")
+            latencies.append(time.perf_counter() - start)
+            i += 7
+
+    await asyncio.gather(*(worker(n) for n in range(20)))
+    return latencies
+
+
+def percentile(values: list, q: float) -> float:
+    values = sorted(values)
+    return values[min(int(len(values) * q), len(values) - 1)] * 1000
+
+
+async def run_load(client, posts: int, seconds: float, action=None) -> tuple:
+    stop = asyncio.Event()
+    task = asyncio.create_task(load(client, stop, posts))
+    result = None
+    start = time.perf_counter()
+    if action is not None:
+        result = await action()
+    await asyncio.sleep(max(seconds - (time.perf_counter() - start), 0))
+    stop.set()
+    latencies = await task
+    return latencies, result
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--posts", type=int, default=5000)
+    parser.add_argument("--seconds", type=float, default=5)
+    args = parser.parse_args()
+
+    engine.echo = False
+    await migrate()
+    backup_store = BackupStore(os.path.join(TMP_DIR, "backups"))
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await seed(client, args.posts)
+
+        baseline, _ = await run_load(client, args.posts, args.seconds)
+        print(f"без копирования:     {len(baseline):>6} запросов  "
+              f"p50 {percentile(baseline, 0.5):6.1f} мс  p99 {percentile(baseline, 0.99):6.1f} мс")
+
+        for label, incremental in (("полный снимок", False), ("инкрементальный", True)):
+            latencies, entry = await run_load(
+                client, args.posts, args.seconds,
+                lambda: create_backup(incremental, backup_store)
+            )
+            throughput = entry["database_bytes"] / entry["seconds"] / 2 ** 20
+            print(f"{label + ':':<20} {len(latencies):>6} запросов  "
+                  f"p50 {percentile(latencies, 0.5):6.1f} мс  p99 {percentile(latencies, 0.99):6.1f} мс  "
+                  f"{entry['database_bytes'] / 2 ** 20:.1f} МБ за {entry['seconds']:.2f} с "
+                  f"({throughput:.0f} МБ/с), сохранено {entry['stored_bytes'] / 2 ** 20:.2f} МБ")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Нагрузочный тест объединения одинаковых запросов
+Пачки одновременных GET /api/posts/{id} и GET /api/posts?page=1
+с объединением и без: число SQL-запросов и задержка
+Требует httpx
+"""
+
+import asyncio
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+TMP_DIR = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{TMP_DIR}/bench.db"
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import httpx
+from sqlalchemy import event
+
+from app.coalesce import coalescer
+from app.database import create_tables, engine
+from main import app
+
+statements = 0
+
+
+@event.listens_for(engine.sync_engine, "before_cursor_execute")
+def _count(*args):
+    global statements
+    statements += 1
+
+
+async def seed(client: httpx.AsyncClient) -> int:
+    topic = (await client.post("/api/topics", json={"name": "viral"})).json()
+    post = (await client.post("/api/posts", json={
+        "title": "Вирусный пост", "content": "x" * 5000, "topic_id": topic["id"]
+    })).json()
+    for i in range(50):
+        await client.post(f"/api/posts/{post['id']}/comments", json={"content": f"c{i}", "author": "a"})
+    return post["id"]
+
+
+async def burst(client: httpx.AsyncClient, url: str, concurrency: int, rounds: int) -> tuple:
+    global statements
+    statements = 0
+    latencies = []
+
+    async def one():
+        start = time.perf_counter()
+        response = await client.get(url)
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        await asyncio.gather(*(one() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return statements, elapsed, latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.99)]
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    engine.echo = False
+    await create_tables()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        post_id = await seed(client)
+        for url in (f"/api/posts/{post_id}", "/api/posts?page=1"):
+            print(f"{url}: {args.rounds} x {args.concurrency} одновременных запросов")
+            for enabled in (False, True):
+                coalescer.enabled = enabled
+                queries, elapsed, p50, p99 = await burst(client, url, args.concurrency, args.rounds)
+                label = "с объединением" if enabled else "без объединения"
+                print(f"  {label:<16} SQL: {queries:>6}  время: {elapsed:6.2f} с  "
+                      f"p50: {p50 * 1000:7.1f} мс  p99: {p99 * 1000:7.1f} мс")
+    print(f"метрики: {coalescer.stats()}")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
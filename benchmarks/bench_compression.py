@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк сжатия ответов
+Для детальной страницы крупного поста: CPU на запрос, размер ответа
+и задержка без сжатия, со сжатием на каждый запрос и из кэша сжатых тел
+Требует httpx; br и zstd — при установленных brotli и zstandard
+"""
+
+import asyncio
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+TMP_DIR = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{TMP_DIR}/bench.db"
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import httpx
+
+from app import compression
+from app.coalesce import coalescer
+from app.database import engine
+from app.migrations import migrate
+from main import app
+
+WORDS = "асинхронный сервис блог пост комментарий тема fastapi sqlalchemy pydantic".split()
+
+
+async def seed(client: httpx.AsyncClient, comments: int) -> int:
+    topic = (await client.post("/api/topics", json={"name": "bench"})).json()
+    content = " ".join(WORDS[i * 7 % len(WORDS)] for i in range(4000))
+    post = (await client.post("/api/posts", json={
+        "title": "Большой пост", "content": content, "topic_id": topic["id"]
+    })).json()
+    for i in range(comments):
+        await client.post(f"/api/posts/{post['id']}/comments", json={
+            "content": " ".join(WORDS[(i + j) % len(WORDS)] for j in range(30)),
+            "author": f"user{i}"
+        })
+    return post["id"]
+
+
+async def measure(client: httpx.AsyncClient, url: str, encoding: str, requests: int) -> dict:
+    latencies, cpu, sizes = [], [], []
+    compress_start = compression.stats.compress_seconds
+    for _ in range(requests):
+        cpu_start = time.process_time()
+        start = time.perf_counter()
+        response = await client.get(url, headers={"Accept-Encoding": encoding})
+        latencies.append(time.perf_counter() - start)
+        cpu.append(time.process_time() - cpu_start)
+        # httpx распаковывает тело, размер на проводе берём из заголовка
+        sizes.append(int(response.headers["content-length"]))
+    return {
+        "bytes": statistics.median(sizes),
+        "p50": statistics.median(latencies) * 1000,
+        "cpu": statistics.mean(cpu) * 1000,
+        "compress": (compression.stats.compress_seconds - compress_start) / requests * 1000,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--comments", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    engine.echo = False
+    coalescer.enabled = False
+    await migrate()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        post_id = await seed(client, args.comments)
+        url = f"/api/posts/{post_id}"
+
+        # CPU процесса включает и распаковку на стороне клиента httpx
+        print(f"{'режим':<18}{'байт':>10}{'p50, мс':>10}{'CPU, мс':>10}{'сжатие, мс':>12}")
+        base = await measure(client, url, "identity", args.requests)
+        print(f"{'identity':<18}{base['bytes']:>10.0f}{base['p50']:>10.2f}{base['cpu']:>10.2f}{0:>12.2f}")
+
+        for encoding in compression.ENCODINGS:
+            for cached in (False, True):
+                compression.cache.max_bytes = compression.COMPRESSION_CACHE_BYTES if cached else 0
+                result = await measure(client, url, encoding, args.requests)
+                label = f"{encoding} {'кэш' if cached else 'каждый раз'}"
+                print(f"{label:<18}{result['bytes']:>10.0f}{result['p50']:>10.2f}{result['cpu']:>10.2f}"
+                      f"{result['compress']:>12.2f}"
+                      f"   экономия {100 - result['bytes'] / base['bytes'] * 100:.0f}%")
+    print(f"метрики: {compression.compression_stats()}")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк хаба событий SSE
+Тысячи одновременных подписчиков в одном воркере: задержка доставки
+и отключение медленных подписчиков
+"""
+
+import asyncio
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.events import Event, EventHub
+
+
+async def fanout(subscribers: int, events: int, queue_size: int) -> None:
+    """Все подписчики успевают читать"""
+    hub = EventHub(queue_size=queue_size)
+    latencies = []
+    done = asyncio.Event()
+    remaining = subscribers
+
+    async def consumer(subscription):
+        nonlocal remaining
+        for _ in range(events):
+            event = await subscription.get()
+            latencies.append(time.perf_counter() - float(event.data))
+        remaining -= 1
+        if remaining == 0:
+            done.set()
+
+    tasks = [asyncio.create_task(consumer(hub.subscribe(("post", 1)))) for _ in range(subscribers)]
+    await asyncio.sleep(0)
+
+    start = time.perf_counter()
+    publish_times = []
+    for i in range(events):
+        t0 = time.perf_counter()
+        hub.publish(("post", 1), Event(i + 1, "comment", repr(t0)))
+        publish_times.append(time.perf_counter() - t0)
+        await asyncio.sleep(0)
+    await done.wait()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    print(f"fanout: {subscribers} подписчиков x {events} событий")
+    print(f"  доставок/с: {subscribers * events / elapsed:,.0f}")
+    print(f"  publish p50: {statistics.median(publish_times) * 1000:.2f} мс")
+    print(f"  задержка p50: {latencies[len(latencies) // 2] * 1000:.2f} мс, "
+          f"p99: {latencies[int(len(latencies) * 0.99)] * 1000:.2f} мс")
+    for task in tasks:
+        task.cancel()
+
+
+async def slow_consumers(subscribers: int, events: int, queue_size: int) -> None:
+    """Десятая часть подписчиков не читает очередь"""
+    hub = EventHub(queue_size=queue_size)
+    slow = [hub.subscribe(("post", 1)) for _ in range(subscribers // 10)]
+    fast = [hub.subscribe(("post", 1)) for _ in range(subscribers - len(slow))]
+
+    async def consumer(subscription):
+        while await subscription.get() is not None:
+            pass
+
+    tasks = [asyncio.create_task(consumer(s)) for s in fast]
+    start = time.perf_counter()
+    for i in range(events):
+        hub.publish(("post", 1), Event(i + 1, "comment", "{}"))
+        await asyncio.sleep(0)
+    elapsed = time.perf_counter() - start
+
+    print(f"slow consumers: {len(slow)} медленных из {subscribers}")
+    print(f"  отключено: {hub.dropped}, осталось подписчиков: {hub.subscribers(('post', 1))}")
+    print(f"  время публикации: {elapsed * 1000:.1f} мс")
+    for task in tasks:
+        task.cancel()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--subscribers", type=int, default=5000)
+    parser.add_argument("--events", type=int, default=200)
+    parser.add_argument("--queue-size", type=int, default=100)
+    args = parser.parse_args()
+
+    await fanout(args.subscribers, args.events, args.queue_size)
+    await slow_consumers(args.subscribers, args.events, args.queue_size)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Микробенчмарк накладных расходов Python на запрос
+Сравнивает построение select(...) на каждый вызов с заранее построенными
+запросами из app.queries
+"""
+
+import asyncio
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import desc, func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import selectinload
+
+from app import queries
+from app.models import Base, Comment, Post, Topic
+
+
+async def seed(session_factory) -> None:
+    async with session_factory() as db:
+        topic = Topic(name="bench")
+        db.add(topic)
+        await db.flush()
+        for i in range(50):
+            post = Post(title=f"post {i}", content="x" * 500, topic_id=topic.id)
+            db.add(post)
+            await db.flush()
+            db.add_all(Comment(content="c", author="a", post_id=post.id) for _ in range(10))
+        await db.commit()
+
+
+def built_per_call():
+    """Запросы в том виде, как они строились на каждый вызов"""
+    return {
+        "get_post": lambda db, i: db.execute(
+            select(Post)
+            .options(selectinload(Post.topic), selectinload(Post.comments))
+            .where(Post.id == i)
+        ),
+        "get_posts": lambda db, i: db.execute(
+            select(Post).options(selectinload(Post.topic)).where(Post.topic_id == 1)
+            .order_by(desc(Post.created_at)).offset(0).limit(10)
+        ),
+        "count_posts": lambda db, i: db.execute(
+            select(func.count(Post.id)).where(Post.topic_id == 1)
+        ),
+        "get_comments": lambda db, i: db.execute(
+            select(Comment).where(Comment.post_id == i)
+            .order_by(Comment.created_at).offset(0).limit(100)
+        ),
+    }
+
+
+def prebuilt():
+    """Заранее построенные запросы с bindparam"""
+    return {
+        "get_post": lambda db, i: db.execute(queries.POST_BY_ID, {"post_id": i}),
+        "get_posts": lambda db, i: db.execute(
+            queries.POSTS_BY_TOPIC, {"topic_id": 1, "skip": 0, "limit": 10}
+        ),
+        "count_posts": lambda db, i: db.execute(queries.POSTS_BY_TOPIC_COUNT, {"topic_id": 1}),
+        "get_comments": lambda db, i: db.execute(
+            queries.COMMENTS_BY_POST, {"post_id": i, "skip": 0, "limit": 100}
+        ),
+    }
+
+
+async def run(session_factory, variant: dict, iterations: int) -> dict:
+    timings = {}
+    async with session_factory() as db:
+        for name, call in variant.items():
+            await call(db, 1)  # прогрев кэша компиляции
+            start = time.perf_counter()
+            for i in range(iterations):
+                result = await call(db, i % 50 + 1)
+                result.all()
+            timings[name] = (time.perf_counter() - start) / iterations
+            db.expunge_all()
+    return timings
+
+
+def construct_only(iterations: int) -> None:
+    """Только построение конструкции и вычисление ключа кэша, без БД"""
+    start = time.perf_counter()
+    for i in range(iterations):
+        statement = (
+            select(Post)
+            .options(selectinload(Post.topic), selectinload(Post.comments))
+            .where(Post.id == i)
+        )
+        statement._generate_cache_key()
+    per_call = (time.perf_counter() - start) / iterations
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        queries.POST_BY_ID._generate_cache_key()
+    prebuilt_per_call = (time.perf_counter() - start) / iterations
+
+    print(f"построение get_post: {per_call * 1e6:.1f} мкс -> {prebuilt_per_call * 1e6:.1f} мкс")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Архив в той же базе: схема "archive" моделей подменяется на основную
+        engine = create_async_engine(
+            f"sqlite+aiosqlite:///{tmp}/bench.db",
+            execution_options={"schema_translate_map": {"archive": None}}
+        )
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        await seed(session_factory)
+
+        before = await run(session_factory, built_per_call(), args.iterations)
+        after = await run(session_factory, prebuilt(), args.iterations)
+        await engine.dispose()
+
+    print(f"{'запрос':<14}{'до, мкс':>10}{'после, мкс':>12}{'выигрыш':>10}")
+    for name in before:
+        gain = (before[name] - after[name]) / before[name] * 100
+        print(f"{name:<14}{before[name] * 1e6:>10.1f}{after[name] * 1e6:>12.1f}{gain:>9.1f}%")
+    construct_only(args.iterations * 10)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Нагрузочный тест потоков SSE через HTTP
+Много открытых GET /api/posts/{id}/comments/stream в одном воркере uvicorn:
+занятые соединения пула, задержка обычных запросов и доставки комментариев
+Требует httpx и uvicorn
+"""
+
+import asyncio
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+TMP_DIR = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{TMP_DIR}/bench.db"
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import httpx
+import uvicorn
+
+from app.database import engine
+from app.events import hub, post_channel
+from main import app
+
+
+def checked_out() -> int:
+    """Соединения, занятые сессиями (у NullPool счётчика нет)"""
+    checkedout = getattr(engine.sync_engine.pool, "checkedout", None)
+    return checkedout() if checkedout else 0
+
+
+async def open_stream(client: httpx.AsyncClient, url: str, ready: asyncio.Event,
+                      counter: list, received: list) -> None:
+    async with client.stream("GET", url) as response:
+        response.raise_for_status()
+        counter[0] += 1
+        if counter[0] == counter[1]:
+            ready.set()
+        async for line in response.aiter_lines():
+            if line.startswith("data: "):
+                received.append(time.perf_counter())
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--streams", type=int, default=500)
+    parser.add_argument("--comments", type=int, default=20)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    engine.echo = False
+    config = uvicorn.Config(app, port=args.port, log_level="warning", timeout_keep_alive=60)
+    server = uvicorn.Server(config)
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    limits = httpx.Limits(max_connections=args.streams + 10)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        topic = (await client.post("/api/topics", json={"name": "live"})).json()
+        post = (await client.post("/api/posts", json={
+            "title": "Трансляция", "content": "x", "topic_id": topic["id"]
+        })).json()
+
+        url = f"/api/posts/{post['id']}/comments/stream"
+        ready = asyncio.Event()
+        counter = [0, args.streams]
+        received: list = []
+        start = time.perf_counter()
+        streams = [
+            asyncio.create_task(open_stream(client, url, ready, counter, received))
+            for _ in range(args.streams)
+        ]
+        await asyncio.wait_for(ready.wait(), 60)
+        while hub.subscribers(post_channel(post["id"])) < args.streams:
+            await asyncio.sleep(0.01)
+        print(f"открыто потоков: {args.streams} за {time.perf_counter() - start:.2f} с")
+        print(f"  занято соединений пула: {checked_out()}")
+
+        latencies = []
+        for _ in range(20):
+            t0 = time.perf_counter()
+            response = await client.get("/api/topics")
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - t0)
+        print(f"  GET /api/topics при открытых потоках: p50 {statistics.median(latencies) * 1000:.1f} мс, "
+              f"max {max(latencies) * 1000:.1f} мс")
+
+        delivery = []
+        for i in range(args.comments):
+            before = len(received)
+            t0 = time.perf_counter()
+            await client.post(f"/api/posts/{post['id']}/comments", json={"content": f"c{i}", "author": "a"})
+            while len(received) < before + args.streams:
+                await asyncio.sleep(0.001)
+            delivery.append(received[-1] - t0)
+        print(f"  доставка комментария всем потокам: p50 {statistics.median(delivery) * 1000:.1f} мс, "
+              f"max {max(delivery) * 1000:.1f} мс")
+
+        for task in streams:
+            task.cancel()
+        await asyncio.gather(*streams, return_exceptions=True)
+
+    server.should_exit = True
+    await server_task
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
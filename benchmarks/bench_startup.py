@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк запуска воркера
+Импорт (включая сборку приложения), lifespan и первый запрос
+для create_all на каждом старте и для режимов SCHEMA_CHECK
+Требует httpx
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Выполняется в отдельном процессе, чтобы импорт был холодным
+CHILD = r"""
+import asyncio, json, sys, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+
+import httpx
+from app.database import create_tables, engine
+
+async def run():
+    engine.echo = False
+    t0 = time.perf_counter()
+    if sys.argv[1] == "create_all":
+        await create_tables()
+        startup = time.perf_counter() - t0
+        context = None
+    else:
+        context = main.app.router.lifespan_context(main.app)
+        await context.__aenter__()
+        startup = time.perf_counter() - t0
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        t1 = time.perf_counter()
+        response = await client.get("/api/posts?page=1")
+        first = time.perf_counter() - t1
+        response.raise_for_status()
+    if context is not None:
+        await context.__aexit__(None, None, None)
+    await engine.dispose()
+    return startup, first
+
+startup, first = asyncio.run(run())
+print(json.dumps({"import": imported - start, "startup": startup, "first_request": first}))
+"""
+
+
+def measure(mode: str, database_url: str, runs: int) -> dict:
+    env = dict(os.environ, DATABASE_URL=database_url)
+    if mode != "create_all":
+        env["SCHEMA_CHECK"] = mode
+    results = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", CHILD, mode],
+            cwd=ROOT, env=env, capture_output=True, text=True, check=True
+        ).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+    return {key: statistics.median(r[key] for r in results) for key in results[0]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = f"sqlite+aiosqlite:///{tmp}/bench.db"
+        subprocess.run(
+            [sys.executable, "-m", "app.migrations"],
+            cwd=ROOT, env=dict(os.environ, DATABASE_URL=database_url),
+            capture_output=True, check=True
+        )
+        print(f"{'режим':<12}{'импорт, мс':>12}{'старт, мс':>12}{'1-й запрос, мс':>16}")
+        for mode in ("create_all", "migrate", "verify", "skip"):
+            result = measure(mode, database_url, args.runs)
+            print(f"{mode:<12}{result['import'] * 1000:>12.1f}{result['startup'] * 1000:>12.1f}"
+                  f"{result['first_request'] * 1000:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,26 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 
-from app.database import create_tables
-from app.routers import posts, comments, topics
+from app.admission import AdmissionMiddleware, controller
+from app.archive import start_archiver
+from app.coalesce import CoalesceTimeout, coalescer
+from app.compression import CompressionMiddleware, compression_stats
+from app.migrations import check_schema
+from app.profiling import ProfilingMiddleware
+from app.routers import posts, comments, topics, events, profiling, backups
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Создание таблиц при запуске
-    await create_tables()
+    # Проверка схемы при запуске (SCHEMA_CHECK=skip отключает DDL на старте)
+    await check_schema()
+    # Фоновый перенос старых комментариев в архив
+    archiver = start_archiver()
     yield
+    if archiver is not None:
+        archiver.cancel()
 
 
 app = FastAPI(
@@ -20,6 +30,12 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# Сжатие ответов с кэшем сжатых тел горячих ответов
+app.add_middleware(CompressionMiddleware)
+
+# Допуск запросов: лимиты на чтение и запись, 503 при перегрузке
+app.add_middleware(AdmissionMiddleware)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -29,10 +45,26 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Профилирование медленных запросов (выключено без PROFILE_TOKEN/PROFILE_SAMPLE_RATE)
+app.add_middleware(ProfilingMiddleware)
+
+@app.exception_handler(CoalesceTimeout)
+async def coalesce_timeout_handler(request: Request, exc: CoalesceTimeout):
+    # Одинаковое чтение выполняется дольше COALESCE_TIMEOUT: сбрасываем нагрузку
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Server is overloaded, retry later"},
+        headers={"Retry-After": "1"}
+    )
+
+
 # Подключение роутеров
 app.include_router(posts.router, prefix="/api", tags=["Posts"])
 app.include_router(comments.router, prefix="/api", tags=["Comments"])
 app.include_router(topics.router, prefix="/api", tags=["Topics"])
+app.include_router(events.router, prefix="/api", tags=["Events"])
+app.include_router(profiling.router, prefix="/debug", tags=["Debug"])
+app.include_router(backups.router, prefix="/admin", tags=["Admin"])
 
 
 @app.get("/")
@@ -45,6 +77,15 @@ async def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/metrics")
+async def metrics():
+    return {
+        "coalescing": coalescer.stats(),
+        "admission": controller.stats(),
+        "compression": compression_stats()
+    }
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
@@ -0,0 +1,12 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Тесты не должны трогать blog.db: своя база во временном каталоге
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{tempfile.mkdtemp()}/test.db"
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import app.database  # noqa: E402
+
+app.database.engine.echo = False
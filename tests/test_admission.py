@@ -0,0 +1,151 @@
+"""Проверки допуска запросов (app.admission)"""
+
+import asyncio
+
+from app.admission import AdmissionController, AdmissionLimiter, AdmissionMiddleware
+
+
+def test_waiters_get_slots_in_order():
+    async def scenario():
+        limiter = AdmissionLimiter("read", limit=1, queue_size=10)
+        assert await limiter.acquire(1)
+        order = []
+
+        async def waiter(n):
+            assert await limiter.acquire(1)
+            order.append(n)
+            limiter.release(0.001)
+
+        tasks = [asyncio.create_task(waiter(n)) for n in range(3)]
+        await asyncio.sleep(0)
+        limiter.release(0.001)
+        await asyncio.gather(*tasks)
+        return limiter, order
+
+    limiter, order = asyncio.run(scenario())
+    assert order == [0, 1, 2]
+    assert limiter.active == 0
+    assert limiter.admitted == 4
+
+
+def test_full_queue_is_shed():
+    async def scenario():
+        limiter = AdmissionLimiter("read", limit=1, queue_size=1)
+        assert await limiter.acquire(1)
+        queued = asyncio.create_task(limiter.acquire(1))
+        await asyncio.sleep(0)
+        rejected = await limiter.acquire(1)
+        limiter.release(0.001)
+        admitted = await queued
+        limiter.release(0.001)
+        return limiter, rejected, admitted
+
+    limiter, rejected, admitted = asyncio.run(scenario())
+    assert rejected is False
+    assert admitted is True
+    assert limiter.shed == 1
+    assert limiter.active == 0
+
+
+def test_timed_out_waiter_leaves_queue():
+    async def scenario():
+        limiter = AdmissionLimiter("read", limit=1, queue_size=10)
+        limiter.service_time = 0
+        assert await limiter.acquire(1)
+        result = await limiter.acquire(0.01)
+        limiter.release(0.001)
+        return limiter, result
+
+    limiter, result = asyncio.run(scenario())
+    assert result is False
+    assert limiter.timeouts == 1
+    assert limiter.stats()["queue_depth"] == 0
+    assert limiter.active == 0
+
+
+def test_cancelled_waiter_leaves_queue():
+    async def scenario():
+        limiter = AdmissionLimiter("read", limit=1, queue_size=10)
+        assert await limiter.acquire(1)
+        first = asyncio.create_task(limiter.acquire(1))
+        second = asyncio.create_task(limiter.acquire(1))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.gather(first, return_exceptions=True)
+        limiter.release(0.001)
+        admitted = await asyncio.wait_for(second, 1)
+        limiter.release(0.001)
+        return limiter, first, admitted
+
+    limiter, first, admitted = asyncio.run(scenario())
+    assert first.cancelled()
+    assert admitted is True
+    assert limiter.active == 0
+    assert limiter.stats()["queue_depth"] == 0
+
+
+def test_slot_handed_to_cancelled_waiter_is_not_lost():
+    async def scenario():
+        limiter = AdmissionLimiter("read", limit=1, queue_size=10)
+        assert await limiter.acquire(1)
+        first = asyncio.create_task(limiter.acquire(1))
+        second = asyncio.create_task(limiter.acquire(1))
+        await asyncio.sleep(0)
+        # Слот передан первому ожидающему, но он отменён раньше, чем проснулся
+        limiter.release(0.001)
+        first.cancel()
+        await asyncio.gather(first, return_exceptions=True)
+        if not first.cancelled():
+            # wait_for в Python 3.11 поглощает отмену уже завершённого ожидания:
+            # слот остаётся у первого, и он его освобождает
+            assert first.result() is True
+            limiter.release(0.001)
+        admitted = await asyncio.wait_for(second, 1)
+        limiter.release(0.001)
+        return limiter, admitted
+
+    limiter, admitted = asyncio.run(scenario())
+    assert admitted is True
+    assert limiter.active == 0
+    assert limiter.stats()["queue_depth"] == 0
+
+
+def test_middleware_rejects_with_retry_after():
+    async def scenario():
+        controller = AdmissionController(enabled=True, max_wait=0)
+        controller.read = AdmissionLimiter("read", limit=1, queue_size=0)
+        release = asyncio.Event()
+
+        async def app(scope, receive, send):
+            await release.wait()
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b""})
+
+        middleware = AdmissionMiddleware(app, controller)
+        scope = {"type": "http", "method": "GET", "path": "/api/posts", "query_string": b"", "headers": []}
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        busy = asyncio.create_task(middleware(scope, None, lambda message: asyncio.sleep(0)))
+        await asyncio.sleep(0)
+        await middleware(scope, None, send)
+        release.set()
+        await busy
+        return controller, sent
+
+    controller, sent = asyncio.run(scenario())
+    assert sent[0]["status"] == 503
+    assert (b"retry-after", b"1") in sent[0]["headers"]
+    assert controller.read.active == 0
+
+
+def test_default_limits_fit_connection_pool():
+    from app.admission import ADMISSION_READ_LIMIT, ADMISSION_WRITE_LIMIT
+    from app.database import engine
+
+    pool = engine.sync_engine.pool
+    # Допущенные запросы получают соединение без ожидания в пуле
+    assert ADMISSION_READ_LIMIT + ADMISSION_WRITE_LIMIT <= pool.size()
+    assert pool.size() + pool._max_overflow > ADMISSION_READ_LIMIT + ADMISSION_WRITE_LIMIT
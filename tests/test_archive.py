@@ -0,0 +1,134 @@
+"""Проверки архива комментариев: пагинация по двум уровням и выдача id"""
+
+import asyncio
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+import app.migrations
+from app.archive import archive_batch, archive_state
+from app.crud import CommentCRUD, PostCRUD, TopicCRUD
+from app.schemas import CommentCreate, PostCreate, TopicCreate
+
+LEGACY_SCHEMA = """
+CREATE TABLE topics (id INTEGER NOT NULL, name VARCHAR(100) NOT NULL, description TEXT,
+    created_at DATETIME, PRIMARY KEY (id));
+CREATE TABLE posts (id INTEGER NOT NULL, title VARCHAR(200) NOT NULL, content TEXT NOT NULL,
+    created_at DATETIME, updated_at DATETIME, topic_id INTEGER NOT NULL, PRIMARY KEY (id),
+    FOREIGN KEY(topic_id) REFERENCES topics (id));
+CREATE TABLE comments (id INTEGER NOT NULL, content TEXT NOT NULL, author VARCHAR(100) NOT NULL,
+    created_at DATETIME, post_id INTEGER NOT NULL, PRIMARY KEY (id),
+    FOREIGN KEY(post_id) REFERENCES posts (id));
+CREATE INDEX ix_comments_id ON comments (id);
+CREATE TABLE comments_archive (id INTEGER NOT NULL, content TEXT NOT NULL, author VARCHAR(100) NOT NULL,
+    created_at DATETIME, archived_at DATETIME, post_id INTEGER NOT NULL, PRIMARY KEY (id));
+"""
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    """Отдельная база на тест; архив в том же файле"""
+    path = tmp_path / "archive_test.db"
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{path}",
+        execution_options={"schema_translate_map": {"archive": None}},
+    )
+    monkeypatch.setattr(app.migrations, "engine", engine)
+    monkeypatch.setattr(archive_state, "has_rows", False)
+    monkeypatch.setattr(archive_state, "_checked_at", None)
+    return path, engine, async_sessionmaker(engine, expire_on_commit=False)
+
+
+async def _post_with_comments(sessions, count: int) -> int:
+    async with sessions() as db:
+        topic = await TopicCRUD.create_topic(db, TopicCreate(name="archive"))
+        post = await PostCRUD.create_post(db, PostCreate(title="t", content="c", topic_id=topic.id))
+        for i in range(count):
+            await CommentCRUD.create_comment(db, CommentCreate(content=f"c{i + 1}", author="a"), post.id)
+        return post.id
+
+
+def test_pagination_spans_both_tiers(database):
+    _, engine, sessions = database
+
+    async def scenario():
+        await app.migrations.migrate()
+        post_id = await _post_with_comments(sessions, 6)
+        async with sessions() as db:
+            # Самый новый комментарий не архивируется, переносятся c1..c3
+            moved = await archive_batch(db, datetime.utcnow() + timedelta(days=1), 3)
+        pages = {}
+        async with sessions() as db:
+            for skip in range(7):
+                for limit in range(1, 7):
+                    comments = await CommentCRUD.get_comments_by_post(db, post_id, skip=skip, limit=limit)
+                    pages[skip, limit] = [comment.content for comment in comments]
+        await engine.dispose()
+        return moved, pages
+
+    moved, pages = asyncio.run(scenario())
+    assert moved == 3
+    everything = [f"c{i + 1}" for i in range(6)]
+    for (skip, limit), page in pages.items():
+        assert page == everything[skip:skip + limit], (skip, limit)
+
+
+def test_new_comment_never_reuses_archived_id(database):
+    _, engine, sessions = database
+
+    async def scenario():
+        await app.migrations.migrate()
+        post_id = await _post_with_comments(sessions, 3)
+        cutoff = datetime.utcnow() + timedelta(days=1)
+        async with sessions() as db:
+            await archive_batch(db, cutoff, 10)
+            # Удаляем самый новый горячий комментарий: горячая таблица пуста
+            assert await CommentCRUD.delete_comment(db, 3)
+            fresh = await CommentCRUD.create_comment(db, CommentCreate(content="new", author="a"), post_id)
+            first = await CommentCRUD.get_comment(db, 1)
+            # Следующая порция архивации не упирается в занятый id
+            await CommentCRUD.create_comment(db, CommentCreate(content="newer", author="a"), post_id)
+            moved = await archive_batch(db, cutoff, 10)
+        await engine.dispose()
+        return fresh.id, first.content, moved
+
+    fresh_id, first, moved = asyncio.run(scenario())
+    assert fresh_id == 4
+    assert first == "c1"
+    assert moved == 1
+
+
+def test_legacy_comments_table_is_rebuilt(database):
+    path, engine, _ = database
+    connection = sqlite3.connect(path)
+    connection.executescript(LEGACY_SCHEMA)
+    connection.execute("INSERT INTO topics (id, name) VALUES (1, 't')")
+    connection.execute("INSERT INTO posts (id, title, content, topic_id) VALUES (1, 't', 'c', 1)")
+    connection.executemany(
+        "INSERT INTO comments (id, content, author, post_id) VALUES (?, 'hot', 'a', 1)", [(8,), (9,)]
+    )
+    connection.execute(
+        "INSERT INTO comments_archive (id, content, author, post_id) VALUES (12, 'cold', 'a', 1)"
+    )
+    connection.commit()
+    connection.close()
+
+    async def scenario():
+        applied = await app.migrations.migrate()
+        await engine.dispose()
+        return applied
+
+    assert 5 in asyncio.run(scenario())
+    connection = sqlite3.connect(path)
+    ddl = connection.execute(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'comments'"
+    ).fetchone()[0]
+    indexes = {row[0] for row in connection.execute("SELECT name FROM pragma_index_list('comments')")}
+    assert "AUTOINCREMENT" in ddl
+    assert {"ix_comments_id", "ix_comments_post_id_created_at", "ix_comments_created_at"} <= indexes
+    assert [row[0] for row in connection.execute("SELECT id FROM comments ORDER BY id")] == [8, 9]
+    # Счётчик поднят выше архивных id
+    cursor = connection.execute("INSERT INTO comments (content, author, post_id) VALUES ('x', 'a', 1)")
+    assert cursor.lastrowid == 13
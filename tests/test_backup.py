@@ -0,0 +1,186 @@
+"""Проверки резервного копирования (app.backup)"""
+
+import hashlib
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from app.backup import BackupStore, copy_with_archive, online_copy
+
+
+def _create(path, rows: int, wal: bool = False) -> None:
+    connection = sqlite3.connect(path)
+    if wal:
+        connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, value TEXT)")
+    connection.executemany("INSERT INTO t (value) VALUES (?)", [("x" * 500,)] * rows)
+    connection.commit()
+    connection.close()
+
+
+def _sha256(path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def test_delta_restore_round_trip(tmp_path):
+    source = tmp_path / "source.db"
+    _create(source, 2000)
+    store = BackupStore(str(tmp_path / "backups"))
+
+    full = store.snapshot(str(source))
+    connection = sqlite3.connect(source)
+    connection.execute("UPDATE t SET value = 'changed' WHERE id = 10")
+    connection.executemany("INSERT INTO t (value) VALUES (?)", [("y" * 500,)] * 100)
+    connection.commit()
+    connection.close()
+    delta = store.snapshot(str(source))
+
+    assert (full["kind"], delta["kind"]) == ("full", "delta")
+    assert delta["changed_pages"] < delta["page_count"]
+
+    restored = tmp_path / "restored.db"
+    store.restore(delta["id"], str(restored))
+    assert _sha256(restored) == delta["sha256"]
+    assert sqlite3.connect(restored).execute("SELECT count(*) FROM t").fetchone()[0] == 2100
+    assert store.verify(delta["id"])["ok"]
+
+    first = tmp_path / "first.db"
+    store.restore(full["id"], str(first))
+    assert sqlite3.connect(first).execute("SELECT count(*) FROM t").fetchone()[0] == 2000
+
+    with pytest.raises(ValueError):
+        store.restore(99, str(tmp_path / "missing.db"))
+
+
+def test_rollback_journal_copy_finishes_under_writes(tmp_path):
+    source = tmp_path / "source.db"
+    target = tmp_path / "copy.db"
+    _create(source, 5000)
+    stop = threading.Event()
+
+    def writer():
+        connection = sqlite3.connect(source, timeout=10)
+        while not stop.is_set():
+            connection.execute("INSERT INTO t (value) VALUES ('w')")
+            connection.commit()
+            time.sleep(0.002)
+        connection.close()
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    # Без ограничения перезапусков копия под записью не завершается
+    copy = threading.Thread(
+        target=online_copy, args=(str(source), str(target)),
+        kwargs={"pages": 8, "sleep": 0.005, "max_restarts": 2}, daemon=True
+    )
+    copy.start()
+    copy.join(30)
+    stop.set()
+    thread.join()
+    assert not copy.is_alive()
+    connection = sqlite3.connect(target)
+    assert connection.execute("PRAGMA integrity_check").fetchone()[0] == "ok"
+    assert connection.execute("SELECT count(*) FROM t").fetchone()[0] >= 5000
+
+
+def test_archive_file_is_backed_up(tmp_path):
+    source = tmp_path / "source.db"
+    archive = tmp_path / "archive.db"
+    _create(source, 100)
+    _create(archive, 50)
+    store = BackupStore(str(tmp_path / "backups"))
+
+    entry = store.snapshot(str(source), archive=str(archive))
+    assert "archive_id" in entry
+    with pytest.raises(ValueError):
+        store.restore(entry["id"], str(tmp_path / "restored.db"))
+
+    restored_archive = tmp_path / "restored_archive.db"
+    store.restore(entry["id"], str(tmp_path / "restored.db"), str(restored_archive))
+    assert sqlite3.connect(restored_archive).execute("SELECT count(*) FROM t").fetchone()[0] == 50
+    assert store.verify(entry["id"])["ok"]
+
+
+def test_wal_copy_is_stepped_without_blocking_writers(tmp_path):
+    source = tmp_path / "source.db"
+    target = tmp_path / "copy.db"
+    _create(source, 20000, wal=True)
+    stop = threading.Event()
+    writes = []
+
+    def writer():
+        connection = sqlite3.connect(source, timeout=10)
+        while not stop.is_set():
+            connection.execute("INSERT INTO t (value) VALUES ('w')")
+            connection.commit()
+            writes.append(time.perf_counter())
+            time.sleep(0.001)
+        connection.close()
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    time.sleep(0.05)
+    started = time.perf_counter()
+    try:
+        restarts = online_copy(str(source), str(target), pages=4, sleep=0.001)
+    finally:
+        finished = time.perf_counter()
+        stop.set()
+        thread.join()
+
+    # Порции читаются из одного снимка: перезапусков нет, запись идёт во время копии
+    assert restarts == 0
+    assert sum(started < moment < finished for moment in writes) > 0
+    connection = sqlite3.connect(target)
+    assert connection.execute("PRAGMA integrity_check").fetchone()[0] == "ok"
+    assert connection.execute("SELECT count(*) FROM t").fetchone()[0] >= 20000
+
+
+def test_archive_copy_is_one_consistent_state(tmp_path):
+    source = tmp_path / "source.db"
+    archive = tmp_path / "archive.db"
+    _create(source, 1000, wal=True)
+    _create(archive, 0, wal=True)
+    stop = threading.Event()
+
+    def mover():
+        # Перенос строк между файлами одной транзакцией, как у архиватора
+        connection = sqlite3.connect(source, timeout=10)
+        connection.execute("ATTACH DATABASE ? AS archive", (str(archive),))
+        while not stop.is_set():
+            row = connection.execute("SELECT min(id) FROM main.t").fetchone()[0]
+            if row is None:
+                break
+            connection.execute("INSERT INTO archive.t SELECT * FROM main.t WHERE id = ?", (row,))
+            connection.execute("DELETE FROM main.t WHERE id = ?", (row,))
+            connection.commit()
+        connection.close()
+
+    thread = threading.Thread(target=mover)
+    thread.start()
+    try:
+        copy_with_archive(str(source), str(tmp_path / "main.copy"), str(archive), str(tmp_path / "archive.copy"),
+                          pages=1, sleep=0.001)
+    finally:
+        stop.set()
+        thread.join()
+
+    hot = sqlite3.connect(tmp_path / "main.copy").execute("SELECT count(*) FROM t").fetchone()[0]
+    cold = sqlite3.connect(tmp_path / "archive.copy").execute("SELECT count(*) FROM t").fetchone()[0]
+    assert hot + cold == 1000
+
+
+def test_app_connections_use_wal():
+    import asyncio
+
+    from app.database import engine
+
+    async def scenario():
+        async with engine.connect() as conn:
+            mode = (await conn.exec_driver_sql("PRAGMA journal_mode")).scalar()
+        await engine.dispose()
+        return mode
+
+    assert asyncio.run(scenario()) == "wal"
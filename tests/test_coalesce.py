@@ -0,0 +1,169 @@
+"""Проверки объединения одинаковых запросов (app.coalesce)"""
+
+import asyncio
+
+import pytest
+
+from app.coalesce import CoalesceTimeout, SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    async def scenario():
+        flight = SingleFlight(timeout=1)
+        calls = 0
+
+        async def load():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return {"id": 1}
+
+        results = await asyncio.gather(*(flight.do("post", load) for _ in range(10)))
+        return flight, calls, results
+
+    flight, calls, results = asyncio.run(scenario())
+    assert calls == 1
+    assert all(result is results[0] for result in results)
+    assert flight.executed == 1
+    assert flight.collapsed == 9
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_error_reaches_every_waiter_and_is_not_cached():
+    async def scenario():
+        flight = SingleFlight(timeout=1)
+        calls = 0
+
+        async def failing():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        results = await asyncio.gather(*(flight.do("post", failing) for _ in range(5)), return_exceptions=True)
+        # Ошибка не запоминается: следующий вызов выполняется заново
+        with pytest.raises(ValueError):
+            await flight.do("post", failing)
+        return flight, calls, results
+
+    flight, calls, results = asyncio.run(scenario())
+    assert all(isinstance(result, ValueError) for result in results)
+    assert calls == 2
+    assert flight.errors == 2
+
+
+def test_waiter_times_out_without_running_load():
+    async def scenario():
+        flight = SingleFlight(timeout=0.02)
+        release = asyncio.Event()
+        calls = 0
+
+        async def stuck():
+            nonlocal calls
+            calls += 1
+            await release.wait()
+            return "slow"
+
+        first = asyncio.create_task(flight.do("post", stuck))
+        await asyncio.sleep(0)
+        # Не дождавшиеся не повторяют работу сами, а получают ошибку
+        waiters = await asyncio.gather(*(flight.do("post", stuck) for _ in range(5)), return_exceptions=True)
+        release.set()
+        return flight, calls, await first, waiters
+
+    flight, calls, first, waiters = asyncio.run(scenario())
+    assert first == "slow"
+    assert calls == 1
+    assert all(isinstance(waiter, CoalesceTimeout) for waiter in waiters)
+    assert flight.timeouts == 5
+
+
+def test_cancelled_caller_does_not_cancel_waiters():
+    async def scenario():
+        flight = SingleFlight(timeout=1)
+
+        async def load():
+            await asyncio.sleep(0.02)
+            return 42
+
+        first = asyncio.create_task(flight.do("post", load))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(flight.do("post", load))
+        await asyncio.sleep(0)
+        first.cancel()
+        return first, await second
+
+    first, second = asyncio.run(scenario())
+    assert first.cancelled()
+    assert second == 42
+
+
+def test_joinable_tracks_request_key_while_in_flight():
+    async def scenario():
+        flight = SingleFlight(timeout=1)
+        release = asyncio.Event()
+        request = ("/api/posts/1", b"")
+
+        async def load():
+            await release.wait()
+            return 1
+
+        task = asyncio.create_task(flight.do("post", load, request))
+        await asyncio.sleep(0)
+        during = flight.joinable(request)
+        release.set()
+        await task
+        return during, flight.joinable(request)
+
+    during, after = asyncio.run(scenario())
+    assert during is True
+    assert after is False
+
+
+def test_slow_load_is_shed_not_repeated(monkeypatch):
+    """Всплеск чтений одного поста при медленной БД: одна загрузка, не больше лимита чтения"""
+    import httpx
+
+    from app.admission import AdmissionLimiter, controller
+    from app.coalesce import coalescer
+    from app.crud import PostCRUD
+    from app.database import engine
+    from app.migrations import migrate
+    from main import app
+
+    original = PostCRUD.get_post
+    loads = active = peak = 0
+
+    async def slow_get_post(db, post_id, fields=None):
+        nonlocal loads, active, peak
+        loads += 1
+        active += 1
+        peak = max(peak, active)
+        try:
+            await asyncio.sleep(0.5)
+            return await original(db, post_id, fields)
+        finally:
+            active -= 1
+
+    async def scenario():
+        await migrate()
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            topic = (await client.post("/api/topics", json={"name": "coalesce"})).json()
+            post = (await client.post("/api/posts", json={
+                "title": "t", "content": "c", "topic_id": topic["id"]
+            })).json()
+
+            monkeypatch.setattr(PostCRUD, "get_post", staticmethod(slow_get_post))
+            monkeypatch.setattr(controller, "read", AdmissionLimiter("read", 2, 256))
+            monkeypatch.setattr(coalescer, "timeout", 0.2)
+            responses = await asyncio.gather(*(client.get(f"/api/posts/{post['id']}") for _ in range(100)))
+        await engine.dispose()
+        return [response.status_code for response in responses]
+
+    statuses = asyncio.run(scenario())
+    assert loads <= 2
+    assert peak <= 2
+    assert 200 in statuses
+    assert set(statuses) <= {200, 503}
+    assert controller.read.active == 0
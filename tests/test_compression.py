@@ -0,0 +1,50 @@
+"""Проверки сжатия ответов (app.compression)"""
+
+import asyncio
+import gzip
+
+from starlette.responses import Response
+
+from app.compression import CompressionMiddleware, negotiate
+
+
+def test_negotiate_respects_quality():
+    assert negotiate("gzip") == "gzip"
+    assert negotiate("identity") is None
+    assert negotiate("gzip;q=0, deflate") is None
+    assert negotiate("br;q=0.1, gzip;q=0.5") == "gzip"
+
+
+def test_shared_response_is_not_modified():
+    # Один объект ответа отправляется несколькими запросами (объединённые чтения)
+    body = b'{"content":"' + b"x" * 5000 + b'"}'
+    response = Response(body, media_type="application/json")
+
+    async def app(scope, receive, send):
+        await response(scope, receive, send)
+
+    middleware = CompressionMiddleware(app, enabled=True, minimum_size=100)
+
+    async def call(accept_encoding: str):
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {
+            "type": "http", "method": "GET", "path": "/api/posts/1", "query_string": b"fields=content",
+            "headers": [(b"accept-encoding", accept_encoding.encode())],
+        }
+        await middleware(scope, None, send)
+        return dict(sent[0]["headers"]), sent[1]["body"]
+
+    async def scenario():
+        return [await call(encoding) for encoding in ("gzip", "identity", "gzip")]
+
+    (gzip_headers, gzip_body), (plain_headers, plain_body), _ = asyncio.run(scenario())
+    assert gzip_headers[b"content-encoding"] == b"gzip"
+    assert gzip.decompress(gzip_body) == body
+    assert b"content-encoding" not in plain_headers
+    assert plain_headers[b"content-length"] == str(len(body)).encode()
+    assert plain_body == body
+    assert dict(response.raw_headers)[b"content-length"] == str(len(body)).encode()
@@ -0,0 +1,86 @@
+"""Проверки хаба событий SSE (app.events)"""
+
+import asyncio
+
+import pytest
+
+from app.events import Event, EventHub
+
+
+def test_publish_reaches_every_subscriber():
+    async def scenario():
+        hub = EventHub(queue_size=10)
+        subscriptions = [hub.subscribe(("post", 1)) for _ in range(3)]
+        other = hub.subscribe(("post", 2))
+        delivered = hub.publish(("post", 1), Event(1, "comment", "{}"))
+        events = [await subscription.get() for subscription in subscriptions]
+        return delivered, events, other
+
+    delivered, events, other = asyncio.run(scenario())
+    assert delivered == 3
+    assert [event.id for event in events] == [1, 1, 1]
+    assert other.queue.empty()
+
+
+def test_slow_subscriber_is_dropped():
+    async def scenario():
+        hub = EventHub(queue_size=2)
+        slow = hub.subscribe(("post", 1))
+        fast = hub.subscribe(("post", 1))
+        received = []
+        for i in range(3):
+            hub.publish(("post", 1), Event(i + 1, "comment", "{}"))
+            received.append(await fast.get())
+        return hub, slow, received
+
+    hub, slow, received = asyncio.run(scenario())
+    assert [event.id for event in received] == [1, 2, 3]
+    assert slow.dropped
+    assert hub.dropped == 1
+    assert hub.subscribers(("post", 1)) == 1
+    # Отключённый подписчик получает только признак отключения
+    assert slow.queue.qsize() == 1
+    assert slow.queue.get_nowait() is None
+
+
+def test_unsubscribe_removes_empty_channel():
+    hub = EventHub()
+    subscription = hub.subscribe(("topic", 1))
+    hub.unsubscribe(subscription)
+    hub.unsubscribe(subscription)
+    assert hub.subscribers(("topic", 1)) == 0
+    assert hub.publish(("topic", 1), Event(1, "post", "{}")) == 0
+
+
+def test_stream_route_releases_connection():
+    """Проверка существования поста не держит соединение пула всё время потока"""
+    from fastapi import HTTPException
+    from starlette.requests import Request
+
+    from app.database import AsyncSessionLocal, engine
+    from app.migrations import migrate
+    from app.models import Post, Topic
+    from app.routers.events import stream_comments
+
+    async def scenario():
+        await migrate()
+        async with AsyncSessionLocal() as db:
+            topic = Topic(name="stream")
+            db.add(topic)
+            await db.flush()
+            post = Post(title="t", content="c", topic_id=topic.id)
+            db.add(post)
+            await db.commit()
+
+        request = Request({"type": "http", "method": "GET", "path": "/", "headers": []})
+        response = await stream_comments(post.id, request, None)
+        checked_out = engine.sync_engine.pool.checkedout()
+        with pytest.raises(HTTPException) as missing:
+            await stream_comments(post.id + 1000, request, None)
+        await engine.dispose()
+        return response, checked_out, missing.value.status_code
+
+    response, checked_out, missing = asyncio.run(scenario())
+    assert response.media_type == "text/event-stream"
+    assert checked_out == 0
+    assert missing == 404
@@ -0,0 +1,96 @@
+"""Проверки разреженных ответов (app.fields, queries.with_fields)"""
+
+import asyncio
+import json
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import inspect
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app import queries
+from app.fields import parse_fields, sparse_json
+from app.models import Base, Comment, Post, Topic
+from app.schemas import Post as PostSchema
+
+RELATIONSHIPS = ("topic", "comments")
+
+
+def test_without_parameters_full_response():
+    assert parse_fields(PostSchema, None, None, RELATIONSHIPS) is None
+
+
+def test_id_is_always_returned():
+    fieldset = parse_fields(PostSchema, "title", None, RELATIONSHIPS)
+    assert fieldset.columns == {"id", "title"}
+    assert fieldset.relationships == frozenset()
+
+
+def test_include_alone_keeps_every_column():
+    fieldset = parse_fields(PostSchema, None, "topic", RELATIONSHIPS)
+    assert fieldset.columns == {"id", "title", "content", "topic_id", "created_at", "updated_at"}
+    assert fieldset.relationships == {"topic"}
+
+
+@pytest.mark.parametrize("fields, include", [
+    ("title,secret", None),
+    # Связь нельзя запросить как колонку
+    ("topic", None),
+    (None, "author"),
+])
+def test_unknown_names_are_rejected(fields, include):
+    with pytest.raises(HTTPException) as error:
+        parse_fields(PostSchema, fields, include, RELATIONSHIPS)
+    assert error.value.status_code == 400
+
+
+def _load(tmp_path, fields, include):
+    """Загрузить пост запросом с опциями разреженной загрузки"""
+    fieldset = parse_fields(PostSchema, fields, include, RELATIONSHIPS)
+    statement = queries.with_fields(queries.POST_BY_ID_BARE, Post, fieldset, queries.POST_RELATIONSHIPS)
+
+    async def scenario():
+        engine = create_async_engine(
+            f"sqlite+aiosqlite:///{tmp_path}/fields.db",
+            execution_options={"schema_translate_map": {"archive": None}},
+        )
+        sessions = async_sessionmaker(engine, expire_on_commit=False)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with sessions() as db:
+            topic = Topic(name="fields")
+            post = Post(title="t", content="long text", topic=topic)
+            post.comments.append(Comment(content="c", author="a"))
+            db.add(post)
+            await db.commit()
+        async with sessions() as db:
+            result = await db.execute(statement, {"post_id": post.id})
+            loaded = result.scalar_one()
+            unloaded = set(inspect(loaded).unloaded)
+            body = json.loads(sparse_json(PostSchema, fieldset, loaded))
+            # Без отложенной загрузки: в async-сессии она завершилась бы ошибкой
+            topic, comments = loaded.topic, list(loaded.comments)
+        await engine.dispose()
+        return unloaded, topic, comments, body
+
+    return asyncio.run(scenario())
+
+
+def test_only_requested_columns_are_loaded(tmp_path):
+    unloaded, topic, comments, body = _load(tmp_path, "title", None)
+    assert {"content", "topic_id", "created_at"} <= unloaded
+    # Незапрошенные связи не подгружаются отдельными запросами
+    assert topic is None
+    assert comments == []
+    assert body == {"id": 1, "title": "t"}
+
+
+def test_included_relationships_are_loaded(tmp_path):
+    unloaded, topic, comments, body = _load(tmp_path, "title", "topic,comments")
+    # Внешний ключ подгружается ради связи many-to-one
+    assert "topic_id" not in unloaded
+    assert "content" in unloaded
+    assert topic.name == "fields"
+    assert len(comments) == 1
+    assert [comment["content"] for comment in body["comments"]] == ["c"]
+    assert set(body) == {"id", "title", "topic", "comments"}
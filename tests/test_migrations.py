@@ -0,0 +1,99 @@
+"""Проверки миграций схемы (app.migrations)"""
+
+import asyncio
+import os
+import sqlite3
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine
+
+import app.migrations
+from app.migrations import LATEST_ARCHIVE_VERSION, LATEST_VERSION, check_schema
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def _run_migrator(database: Path, archive: Path = None) -> subprocess.Popen:
+    env = dict(os.environ, DATABASE_URL=f"sqlite+aiosqlite:///{database}")
+    env.pop("ARCHIVE_DATABASE_PATH", None)
+    if archive is not None:
+        env["ARCHIVE_DATABASE_PATH"] = str(archive)
+    return subprocess.Popen(
+        [sys.executable, "-m", "app.migrations"],
+        cwd=ROOT, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT
+    )
+
+
+def _migrate(database: Path, archive: Path = None) -> int:
+    migrator = _run_migrator(database, archive)
+    migrator.communicate(timeout=60)
+    return migrator.returncode
+
+
+def _tables(path: Path, versions: str) -> tuple:
+    connection = sqlite3.connect(path)
+    tables = {row[0] for row in connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    applied = [row[0] for row in connection.execute(f"SELECT version FROM {versions} ORDER BY version")] \
+        if versions in tables else []
+    connection.close()
+    return tables, applied
+
+
+def test_concurrent_migrators_apply_each_version_once(tmp_path):
+    database = tmp_path / "concurrent.db"
+    # Воркеры стартуют одновременно и гонятся за блокировкой записи
+    migrators = [_run_migrator(database) for _ in range(6)]
+    outputs = [migrator.communicate(timeout=60)[0].decode() for migrator in migrators]
+    assert [migrator.returncode for migrator in migrators] == [0] * 6, outputs
+    tables, applied = _tables(database, "schema_migrations")
+    assert {"topics", "posts", "comments"} <= tables
+    assert applied == list(range(1, LATEST_VERSION + 1))
+
+
+def test_archive_chain_lives_in_archive_file(tmp_path):
+    database = tmp_path / "main.db"
+    archive = tmp_path / "archive.db"
+    migrator = _run_migrator(database, archive)
+    output = migrator.communicate(timeout=60)[0].decode()
+    assert migrator.returncode == 0, output
+
+    main_tables, applied = _tables(database, "schema_migrations")
+    archive_tables, archive_applied = _tables(archive, "archive_migrations")
+    assert applied == list(range(1, LATEST_VERSION + 1))
+    assert not {"comments_archive", "archive_migrations"} & main_tables
+    assert {"comments_archive", "archive_migrations"} <= archive_tables
+    assert archive_applied == list(range(1, LATEST_ARCHIVE_VERSION + 1))
+
+
+def test_archive_file_attached_later_is_migrated(tmp_path):
+    database = tmp_path / "main.db"
+    archive = tmp_path / "archive.db"
+    # Основная база уже актуальна, архив в ней же; затем архив выносится в файл
+    assert _migrate(database) == 0
+    assert _migrate(database, archive) == 0
+    archive_tables, archive_applied = _tables(archive, "archive_migrations")
+    assert "comments_archive" in archive_tables
+    assert archive_applied == list(range(1, LATEST_ARCHIVE_VERSION + 1))
+
+
+def test_verify_does_not_run_ddl(tmp_path, monkeypatch):
+    path = tmp_path / "verify.db"
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{path}",
+        execution_options={"schema_translate_map": {"archive": None}},
+    )
+    monkeypatch.setattr(app.migrations, "engine", engine)
+
+    async def scenario():
+        try:
+            with pytest.raises(RuntimeError, match="behind"):
+                await check_schema("verify")
+            await check_schema("skip")
+        finally:
+            await engine.dispose()
+
+    asyncio.run(scenario())
+    assert _tables(path, "schema_migrations") == (set(), [])
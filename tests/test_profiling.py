@@ -0,0 +1,33 @@
+"""Проверки профилирования по заголовку X-Profile (app.profiling)"""
+
+import asyncio
+
+import pytest
+
+import app.profiling
+from app.profiling import ProfileStore, ProfilingMiddleware
+
+
+async def _endpoint(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+@pytest.mark.parametrize("headers, profiled", [
+    ([(b"x-profile", b"secret")], True),
+    ([(b"x-profile", b"secre")], False),
+    ([(b"x-profile", b"secret-and-more")], False),
+    ([(b"x-other", b"secret")], False),
+    ([], False),
+])
+def test_profile_only_with_matching_token(headers, profiled, monkeypatch):
+    store = ProfileStore()
+    monkeypatch.setattr(app.profiling, "profiles", store)
+    middleware = ProfilingMiddleware(_endpoint, token="secret", sample_rate=0)
+    scope = {"type": "http", "method": "GET", "path": "/api/topics", "headers": headers}
+
+    async def send(message):
+        pass
+
+    asyncio.run(middleware(scope, None, send))
+    assert len(store.list()) == int(profiled)